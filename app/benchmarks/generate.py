@@ -0,0 +1,97 @@
+import argparse
+import json
+import random
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+
+
+def load_templates(paths=None):
+    # Job `data` objects from the bundled feeds, used as templates for synthetic jobs
+    paths = paths or sorted(DATA_DIR.glob('*.json'))
+    templates = []
+    for path in paths:
+        with open(path, encoding='utf-8') as file:
+            templates.extend(job['data'] for job in json.load(file).get('jobs', []))
+    return templates
+
+
+def iter_synthetic_jobs(count, templates, duplicate_rate=0.0, update_rate=0.0, seed=0, reservoir_size=10000):
+    # Yield `count` job data objects shaped like the templates.
+    # duplicate_rate: share of jobs that repeat an earlier job unchanged;
+    # update_rate: share that repeat an earlier req_id with a newer update_date and salary.
+    rng = random.Random(seed)
+    # Earlier unique jobs that duplicates and updates are drawn from: a uniform sample of at most
+    # reservoir_size of them (reservoir sampling), so memory stays flat however many jobs are generated
+    emitted = []
+    unique = 0
+    for index in range(count):
+        roll = rng.random()
+        if emitted and roll < duplicate_rate:
+            yield rng.choice(emitted)
+        elif emitted and roll < duplicate_rate + update_rate:
+            job = dict(rng.choice(emitted))
+            job['update_date'] = f"2024-{rng.randint(3, 12):02d}-{rng.randint(1, 28):02d}T00:00:00+0000"
+            if job.get('salary_value') is not None:
+                job['salary_value'] = job['salary_value'] + rng.randint(1, 5000)
+            yield job
+        else:
+            template = templates[index % len(templates)]
+            job = dict(template)
+            job['req_id'] = f"{template['req_id']}-{index}"
+            job['slug'] = f"{template['slug']}-{index}"
+            unique += 1
+            if len(emitted) < reservoir_size:
+                emitted.append(job)
+            else:
+                slot = rng.randrange(unique)
+                if slot < reservoir_size:
+                    emitted[slot] = job
+            yield job
+
+
+def write_feed(path, jobs):
+    # Write jobs in the bundled feed shape ({"jobs": [{"data": ...}, ...]}) without holding them all in memory
+    count = 0
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('{"jobs":[')
+        for job in jobs:
+            if count:
+                file.write(',')
+            file.write(json.dumps({'data': job}, ensure_ascii=False))
+            count += 1
+        file.write(f'],"totalCount":{count},"count":{count}}}')
+    return count
+
+
+def generate(out, jobs, duplicate_rate=0.0, update_rate=0.0, seed=0, files=1):
+    # Generate `jobs` synthetic jobs split over `files` feed files; returns the written paths
+    out = Path(out)
+    templates = load_templates()
+    stream = iter_synthetic_jobs(jobs, templates, duplicate_rate, update_rate, seed)
+    if files == 1:
+        write_feed(out, stream)
+        return [out]
+
+    out.mkdir(parents=True, exist_ok=True)
+    per_file = -(-jobs // files)
+    paths = []
+    for index in range(files):
+        path = out / f"feed_{index:05d}.json"
+        write_feed(path, (job for _, job in zip(range(per_file), stream)))
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic job feeds shaped like data/*.json.")
+    parser.add_argument('--jobs', type=int, default=100000, help="Number of jobs to generate")
+    parser.add_argument('--duplicate-rate', type=float, default=0.1, help="Share of jobs repeating an earlier job")
+    parser.add_argument('--update-rate', type=float, default=0.05, help="Share of jobs updating an earlier job")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--files', type=int, default=1, help="Split the jobs over this many feed files")
+    parser.add_argument('--out', default='bench_feed.json', help="Output file (or directory when --files > 1)")
+    args = parser.parse_args()
+
+    paths = generate(args.out, args.jobs, args.duplicate_rate, args.update_rate, args.seed, args.files)
+    print(f"Wrote {args.jobs} jobs to {len(paths)} file(s) under {args.out}")
@@ -0,0 +1,217 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from twisted.internet import defer
+from twisted.python.failure import Failure
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(APP_DIR / 'jobs_project'))
+
+from benchmarks.generate import generate
+from benchmarks.stores import InMemoryMongo, InMemoryPostgres, InMemoryRedis
+
+SCENARIOS = ('parse', 'pipeline', 'export')
+
+# MongoDB export variants (format, compression); the columnar ones need pyarrow, zstd needs zstandard
+EXPORT_FORMATS = (('csv', 'none'), ('csv', 'gzip'), ('csv', 'zstd'), ('parquet', 'zstd'), ('arrow', 'zstd'))
+
+
+def peak_rss_mb():
+    # Peak resident set size of this process (ru_maxrss is in KiB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def summarize(scenario, variant, items, seconds, latencies=None):
+    # One result row; latencies are per-item seconds where the scenario measures them
+    result = {
+        'scenario': scenario,
+        'variant': variant,
+        'items': items,
+        'seconds': round(seconds, 4),
+        'items_per_sec': round(items / seconds, 1) if seconds else None,
+        'p50_ms': None,
+        'p99_ms': None,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+    if latencies and len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100)
+        result['p50_ms'] = round(cuts[49] * 1000, 4)
+        result['p99_ms'] = round(cuts[98] * 1000, 4)
+    return result
+
+
+def parse_records(feed, streaming, local=False):
+    # Run the spider's parse_page over a feed file without the downloader, or with `local`
+    # its memory-mapped fast path for local feeds
+    from scrapy import Request
+    from scrapy.http import TextResponse
+    from scrapy.settings import Settings
+    from jobs_project.spiders.json_spider import Jobpider
+
+    spider = Jobpider(feeds=feed) if local else Jobpider()
+    spider.settings = Settings({'JOBS_FEED_STREAMING': streaming})
+    if local:
+        return spider.parse_local_feeds(None)
+    url = Path(feed).resolve().as_uri()
+    response = TextResponse(url=url, body=Path(feed).read_bytes(), encoding='utf-8', request=Request(url))
+    return spider.parse_page(response)
+
+
+def bench_parse(feed, latency):
+    results = []
+    for variant, streaming, local in (('streaming', True, False), ('json.loads', False, False), ('local-mmap', True, True)):
+        latencies = []
+        start = last = time.perf_counter()
+        for _ in parse_records(feed, streaming, local):
+            now = time.perf_counter()
+            latencies.append(now - last)
+            last = now
+        results.append(summarize('parse', variant, len(latencies), time.perf_counter() - start, latencies))
+    return results
+
+
+def make_pipeline(latency, dedup_mode='content'):
+    # The real pipeline wired to in-process stores with the default settings.py thresholds
+    from jobs_project.pipelines import JobsProjectPipeline
+
+    class BenchmarkPipeline(JobsProjectPipeline):
+        postgres_connector_class = InMemoryPostgres
+        redis_connector_class = InMemoryRedis
+        mongo_connector_class = InMemoryMongo
+
+    store_settings = {'latency': latency}
+    return BenchmarkPipeline(
+        store_settings, store_settings, store_settings,
+        {'batch_size': 500, 'flush_interval': 5.0},
+        {'batch_size': 1000, 'flush_interval': 5.0},
+        {'mode': dedup_mode, 'cache_size': 100000, 'claim_batch_size': 100, 'claim_ttl': 600,
+         'namespace': 'jobs:dedup', 'buckets': 65536, 'ttl': 2592000},
+    )
+
+
+def in_reactor(func, *args):
+    # Run func (which may return a Deferred) under the Twisted reactor and return its result: the pipeline
+    # writes on the reactor's worker threads. Every scenario has a process of its own, so the reactor runs once.
+    from twisted.internet import reactor
+
+    outcome = []
+
+    def main():
+        d = defer.maybeDeferred(func, *args)
+        d.addBoth(outcome.append)
+        d.addBoth(lambda _: reactor.stop())
+
+    reactor.callWhenRunning(main)
+    reactor.run(installSignalHandlers=False)
+    if isinstance(outcome[0], Failure):
+        outcome[0].raiseException()
+    return outcome[0]
+
+
+@defer.inlineCallbacks
+def run_pipeline(pipeline, records, latencies=None):
+    # Feed records through the pipeline the way Scrapy does, waiting whenever process_item returns a Deferred
+    spider = SimpleNamespace(logger=logging.getLogger('benchmark'))
+    pipeline.open_spider(spider)
+    for record in records:
+        item_start = time.perf_counter()
+        result = pipeline.process_item(record, spider)
+        if isinstance(result, defer.Deferred):
+            yield result
+        if latencies is not None:
+            latencies.append(time.perf_counter() - item_start)
+    yield pipeline.close_spider(spider)
+
+
+def bench_pipeline(feed, latency):
+    return in_reactor(pipeline_runs, feed, latency)
+
+
+@defer.inlineCallbacks
+def pipeline_runs(feed, latency):
+    records = list(parse_records(feed, True))
+    results = []
+    for mode in ('presence', 'content'):
+        pipeline = make_pipeline(latency, mode)
+        latencies = []
+        start = time.perf_counter()
+        yield run_pipeline(pipeline, records, latencies)
+        results.append(summarize('pipeline', f"dedup={mode}", len(records), time.perf_counter() - start, latencies))
+    return results
+
+
+def bench_export(feed, latency):
+    import query
+
+    pipeline = make_pipeline(0.0)
+    in_reactor(run_pipeline, pipeline, parse_records(feed, True))
+    postgres, mongo = pipeline.postgresql, pipeline.mongodb
+    postgres.latency = mongo.latency = latency
+    rows = len(postgres.tables[query.POSTGRES_TABLE][1])
+
+    results = []
+    with tempfile.TemporaryDirectory() as out:
+        table_query = f"SELECT * FROM {query.POSTGRES_TABLE}"
+        for mode in ('copy', 'cursor'):
+            start = time.perf_counter()
+            query.export_postgres(postgres, table_query, os.path.join(out, f"postgres_{mode}.csv"), mode=mode)
+            results.append(summarize('export', f"postgres-{mode}", rows, time.perf_counter() - start))
+        for fmt, compression in EXPORT_FORMATS:
+            filename = query.output_filename(os.path.join(out, 'mongo.csv'), fmt, compression)
+            start = time.perf_counter()
+            query.export_mongo(mongo, query.MONGO_COLLECTION, filename, fmt=fmt, compression=compression)
+            result = summarize('export', f"mongo-{fmt}-{compression}", rows, time.perf_counter() - start)
+            result['output_mb'] = round(os.path.getsize(filename) / (1024 * 1024), 2)
+            results.append(result)
+    return results
+
+
+def run_scenario(scenario, feed, latency):
+    # Entry point of the per-scenario child process
+    return globals()[f"bench_{scenario}"](feed, latency)
+
+
+def run(scenarios, feed, latency):
+    # Each scenario runs in a fresh process so peak RSS and warm caches do not carry over
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for scenario in scenarios:
+        with context.Pool(1) as pool:
+            results.extend(pool.apply(run_scenario, (scenario, feed, latency)))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark feed parsing, the item pipeline and exports against in-process stores.")
+    parser.add_argument('--feed', help="Feed file to use instead of generating one")
+    parser.add_argument('--jobs', type=int, default=50000, help="Jobs in the generated feed")
+    parser.add_argument('--duplicate-rate', type=float, default=0.1)
+    parser.add_argument('--update-rate', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenario', choices=SCENARIOS, action='append', help="Scenario to run (repeatable; default: all)")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Simulated round trip per store call")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        feed = args.feed
+        if not feed:
+            feed = os.path.join(workdir, 'feed.json')
+            generate(feed, args.jobs, args.duplicate_rate, args.update_rate, args.seed)
+        results = run(args.scenario or SCENARIOS, feed, args.latency_ms / 1000)
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(report)
+    print(report)
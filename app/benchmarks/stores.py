@@ -0,0 +1,222 @@
+import csv
+import re
+import time
+
+# In-process stand-ins for the infra connectors. They keep data in dicts and can add a fixed
+# per-call latency to mimic a network round trip, so batching and dedup can be measured offline.
+
+TABLE_NAME = re.compile(r'FROM\s+"?(\w+)"?', re.IGNORECASE)
+
+
+class InMemoryStore:
+    def __init__(self, latency=0.0, **_):
+        # `latency` is the simulated round trip in seconds; connection settings are accepted and ignored
+        self.latency = latency
+        self.calls = 0
+
+    def round_trip(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def connect(self):
+        self.round_trip()
+
+    def ping(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class InMemoryPostgres(InMemoryStore):
+    def __init__(self, latency=0.0, **settings):
+        super().__init__(latency, **settings)
+        self.tables = {}  # table -> (columns, {key: row})
+
+    def execute(self, query, params=None):
+        self.round_trip()
+
+    def execute_all(self, queries):
+        self.round_trip()
+
+    def fetch_data(self, query, params=None):
+        self.round_trip()
+        return []
+
+    def upsert_many(self, table, columns, rows, key, page_size=500):
+        for _ in range(0, len(rows), page_size):
+            self.round_trip()
+        self._store(table, columns, rows, key)
+
+    def upsert(self, table, columns, row, key):
+        self.round_trip()
+        self._store(table, columns, [row], key)
+
+    def insert_missing(self, table, columns, rows, key, page_size=500):
+        for _ in range(0, len(rows), page_size):
+            self.round_trip()
+        self._store(table, columns, rows, key, replace=False)
+
+    def _store(self, table, columns, rows, key, replace=True):
+        stored_columns, stored_rows = self.tables.setdefault(table, (tuple(columns), {}))
+        index = stored_columns.index(key)
+        for row in rows:
+            if replace or row[index] not in stored_rows:
+                stored_rows[row[index]] = row
+
+    def _table_rows(self, query):
+        columns, rows = self.tables.get(TABLE_NAME.search(query).group(1), ((), {}))
+        return list(columns), rows.values()
+
+    def stream_data(self, query, params=None, itersize=2000):
+        self.round_trip()
+        columns, rows = self._table_rows(query)
+
+        def batches():
+            for count, row in enumerate(rows, 1):
+                yield row
+                if count % itersize == 0:
+                    self.round_trip()
+
+        return columns, batches()
+
+    def copy_to(self, query, file, params=None):
+        self.round_trip()
+        columns, rows = self._table_rows(query)
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+
+class InMemoryMongo(InMemoryStore):
+    def __init__(self, latency=0.0, **settings):
+        super().__init__(latency, **settings)
+        self.collections = {}  # collection -> {key: document}
+        self.indexes = {}  # collection -> index names
+
+    def create_unique_index(self, collection, key='req_id'):
+        self.round_trip()
+
+    def create_index(self, collection, keys, **options):
+        self.round_trip()
+        self.indexes.setdefault(collection, set()).add(options.get('name') or str(keys))
+
+    def index_names(self, collection):
+        self.round_trip()
+        return sorted(self.indexes.get(collection, ()))
+
+    def drop_index(self, collection, name):
+        self.round_trip()
+        self.indexes.get(collection, set()).discard(name)
+
+    def update_many(self, collection, query, update):
+        self.round_trip()
+        return 0
+
+    def insert_one(self, collection, document):
+        self.round_trip()
+        self.collections.setdefault(collection, {})[id(document)] = document
+
+    def upsert_one(self, collection, document, key='req_id'):
+        self.round_trip()
+        self.collections.setdefault(collection, {})[document[key]] = document
+
+    def bulk_upsert(self, collection, docs, key='req_id', batch_size=1000):
+        documents = self.collections.setdefault(collection, {})
+        for start in range(0, len(docs), batch_size):
+            self.round_trip()
+            for doc in docs[start:start + batch_size]:
+                documents[doc[key]] = doc
+        return len(docs), 0
+
+    def insert_missing(self, collection, docs, key='_id'):
+        self.round_trip()
+        documents = self.collections.setdefault(collection, {})
+        for doc in docs:
+            documents.setdefault(doc[key], doc)
+
+    def bulk_update(self, collection, updates):
+        self.round_trip()
+        return 0
+
+    def aggregate(self, collection, pipeline):
+        self.round_trip()
+        return []
+
+    def iter_documents(self, collection, query=None, projection=None, batch_size=1000):
+        self.round_trip()
+        fields = [name for name, include in (projection or {}).items() if include and name != '_id']
+        documents = self.collections.get(collection, {})
+        keys = (query or {}).get('_id', {}).get('$in')  # The only filter the stand-in applies
+        if keys is not None:
+            documents = {key: documents[key] for key in keys if key in documents}
+        for count, document in enumerate(documents.values(), 1):
+            yield {name: document.get(name) for name in fields} if fields else document
+            if count % batch_size == 0:
+                self.round_trip()
+
+
+class InMemoryRedis(InMemoryStore):
+    def __init__(self, latency=0.0, **settings):
+        super().__init__(latency, **settings)
+        self.values = {}
+        self.hashes = {}
+
+    def exists(self, key):
+        self.round_trip()
+        return int(key in self.values)
+
+    def set(self, key, value):
+        self.round_trip()
+        self.values[key] = str(value)
+
+    def claim_fields(self, entries, claim_ttl, expire_at=0):
+        # Same rules as RedisConnector's Lua script
+        self.round_trip()
+        now = int(time.time())
+        claimed = []
+        for index, (current, previous, field, fingerprint) in enumerate(entries):
+            value = self.hashes.get(current, {}).get(field)
+            carried = value is None and previous != current and field in self.hashes.get(previous, {})
+            if carried:
+                value = self.hashes[previous][field]
+            if value is not None and value.startswith('~'):
+                claimable = int(value[1:].split(':', 1)[0]) < now
+            else:
+                claimable = value != fingerprint
+            if claimable:
+                self.hashes.setdefault(current, {})[field] = f"~{now + claim_ttl}:{fingerprint}"
+                claimed.append(index)
+            elif carried:
+                self.hashes.setdefault(current, {})[field] = value
+        return claimed
+
+    def set_fields(self, entries, expire_at=0):
+        self.round_trip()
+        for key, field, value in entries:
+            self.hashes.setdefault(key, {})[field] = str(value)
+
+    def delete_fields(self, entries):
+        self.round_trip()
+        for key, field in entries:
+            self.hashes.get(key, {}).pop(field, None)
+
+    def get(self, key):
+        self.round_trip()
+        return self.values.get(key)
+
+    def incr(self, key):
+        self.round_trip()
+        self.values[key] = str(int(self.values.get(key, 0)) + 1)
+        return int(self.values[key])
+
+    def set_tracked(self, key, value, ttl, index, max_entries):
+        self.round_trip()
+        self.values[key] = value
+
+    def delete_many(self, keys):
+        if keys:
+            self.round_trip()
+            for key in keys:
+                self.values.pop(key, None)
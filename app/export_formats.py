@@ -0,0 +1,230 @@
+import csv
+import gzip
+import io
+import os
+import shutil
+from datetime import datetime
+from itertools import islice
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from infra.codec import codec
+from jobs_project.schema import FIELDS_BY_NAME
+
+# Output formats and compressions accepted by query.py
+FORMATS = ('csv', 'parquet', 'arrow')
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+
+EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow'}
+CSV_SUFFIXES = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+CHUNK_ROWS = 10000
+
+
+def split_filename(filename):
+    # 'out/data.csv.gz' -> ('out/data', '.csv.gz'); the extension is everything after the first dot
+    directory, name = os.path.split(filename)
+    stem, dot, ext = name.partition('.')
+    return os.path.join(directory, stem), dot + ext
+
+
+def output_filename(filename, fmt='csv', compression='none'):
+    # Replace the extension of a default output name to match the format and compression
+    stem, _ = split_filename(filename)
+    suffix = CSV_SUFFIXES[compression] if fmt == 'csv' else ''
+    return stem + EXTENSIONS[fmt] + suffix
+
+
+def open_text(filename, mode='w', compression='none'):
+    # Text file object that (de)compresses on the fly; `mode` is 'w' or 'r'
+    if compression == 'gzip':
+        return gzip.open(filename, mode + 't', encoding='utf-8', newline='', compresslevel=6)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstd compression requires the 'zstandard' package")
+        raw = open(filename, mode + 'b')
+        if mode == 'w':
+            stream = zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    return open(filename, mode, encoding='utf-8', newline='')
+
+
+def write_csv(rows, filename, headers=None, compression='none'):
+    # Write rows as (optionally compressed) CSV; rows are consumed lazily
+    with open_text(filename, 'w', compression) as file:
+        writer = csv.writer(file)
+        if headers:
+            writer.writerow(headers)
+        writer.writerows(rows)
+
+
+def require_pyarrow(fmt):
+    if pyarrow is None:
+        raise ImportError(f"{fmt} export requires the 'pyarrow' package")
+
+
+def arrow_type(column):
+    # Arrow type of an exported column; JSON fields are stored as JSON text, unknown columns as strings
+    job_field = FIELDS_BY_NAME.get(column)
+    if job_field is None or job_field.json or job_field.type is str:
+        if job_field is not None and job_field.categorical:
+            return pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+        return pyarrow.string()
+    return {
+        int: pyarrow.int64(),
+        float: pyarrow.float64(),
+        bool: pyarrow.bool_(),
+        datetime: pyarrow.timestamp('us', tz='UTC'),
+    }[job_field.type]
+
+
+class DictionaryColumn:
+    def __init__(self):
+        # Dictionary that only ever grows, so each chunk's dictionary extends the previous one
+        # (an IPC file can then carry it as deltas) and indexes stay stable across chunks
+        self.indexes = {}
+        self.values = []
+
+    def encode(self, values):
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+                continue
+            index = self.indexes.get(value)
+            if index is None:
+                index = self.indexes[value] = len(self.values)
+                self.values.append(value)
+            indices.append(index)
+        return pyarrow.DictionaryArray.from_arrays(
+            pyarrow.array(indices, type=pyarrow.int32()),
+            pyarrow.array(self.values, type=pyarrow.string())
+        )
+
+
+class ColumnarWriter:
+    def __init__(self, filename, columns, fmt='parquet', compression='zstd', chunk_rows=CHUNK_ROWS):
+        # Write rows to Parquet or an Arrow IPC file in record batches of `chunk_rows`
+        require_pyarrow(fmt)
+        self.columns = list(columns)
+        self.chunk_rows = chunk_rows
+        self.schema = pyarrow.schema([(column, arrow_type(column)) for column in self.columns])
+        self.json_columns = {
+            index for index, column in enumerate(self.columns)
+            if column in FIELDS_BY_NAME and FIELDS_BY_NAME[column].json
+        }
+        self.dictionaries = {
+            index: DictionaryColumn() for index, field in enumerate(self.schema)
+            if pyarrow.types.is_dictionary(field.type)
+        }
+        compression = None if compression == 'none' else compression
+        if fmt == 'parquet':
+            self.writer = pyarrow.parquet.ParquetWriter(
+                filename, self.schema, compression=compression or 'none',
+                use_dictionary=[self.columns[index] for index in self.dictionaries]
+            )
+        else:
+            if compression == 'gzip':
+                raise ValueError("Arrow IPC files support zstd (or no) compression, not gzip")
+            options = pyarrow.ipc.IpcWriteOptions(compression=compression, emit_dictionary_deltas=True)
+            self.writer = pyarrow.ipc.new_file(filename, self.schema, options=options)
+
+    def column_values(self, index, rows):
+        values = [row[index] for row in rows]
+        if index in self.json_columns:
+            # Rows from psycopg2 carry decoded jsonb; documents carry lists. Both are written as JSON text.
+            return [value if value is None or isinstance(value, str) else codec.dumps(value) for value in values]
+        return values
+
+    def write_chunk(self, rows):
+        arrays = []
+        for index, field in enumerate(self.schema):
+            values = self.column_values(index, rows)
+            if index in self.dictionaries:
+                arrays.append(self.dictionaries[index].encode(values))
+            else:
+                arrays.append(pyarrow.array(values, type=field.type))
+        self.writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def write_rows(self, rows):
+        # Consume the rows lazily, holding at most one chunk in memory
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_rows))
+            if not chunk:
+                return
+            self.write_chunk(chunk)
+
+    def close(self):
+        self.writer.close()
+
+
+def write_columnar(rows, filename, columns, fmt='parquet', compression='zstd', chunk_rows=CHUNK_ROWS):
+    writer = ColumnarWriter(filename, columns, fmt, compression, chunk_rows)
+    try:
+        writer.write_rows(rows)
+    finally:
+        writer.close()
+
+
+def read_columns(filename, fmt):
+    # Column names stored in a Parquet or Arrow IPC file
+    require_pyarrow(fmt)
+    if fmt == 'parquet':
+        return pyarrow.parquet.read_schema(filename).names
+    with pyarrow.ipc.open_file(filename) as reader:
+        return reader.schema.names
+
+
+def iter_columnar_batches(filename, fmt):
+    # Record batches of a Parquet or Arrow IPC file, read one at a time
+    require_pyarrow(fmt)
+    if fmt == 'parquet':
+        yield from pyarrow.parquet.ParquetFile(filename).iter_batches()
+        return
+    with pyarrow.ipc.open_file(filename) as reader:
+        for index in range(reader.num_record_batches):
+            yield reader.get_batch(index)
+
+
+def merge_parts(parts, filename, fmt='csv', compression='none', chunk_rows=CHUNK_ROWS):
+    # Concatenate partition files into one output of the same format, chunk by chunk
+    if fmt == 'csv':
+        if compression == 'none':
+            with open(filename, 'wb') as merged:
+                for index, part in enumerate(parts):
+                    with open(part, 'rb') as source:
+                        header = source.readline()
+                        if index == 0:
+                            merged.write(header)
+                        shutil.copyfileobj(source, merged)
+        else:
+            with open_text(filename, 'w', compression) as merged:
+                for index, part in enumerate(parts):
+                    with open_text(part, 'r', compression) as source:
+                        header = source.readline()
+                        if index == 0:
+                            merged.write(header)
+                        shutil.copyfileobj(source, merged)
+    elif parts:
+        writer = ColumnarWriter(filename, read_columns(parts[0], fmt), fmt, compression, chunk_rows)
+        try:
+            for part in parts:
+                for batch in iter_columnar_batches(part, fmt):
+                    writer.write_rows(zip(*(column.to_pylist() for column in batch.columns)))
+        finally:
+            writer.close()
+    for part in parts:
+        os.remove(part)
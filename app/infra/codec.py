@@ -0,0 +1,92 @@
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Every backend emits the same compact form (no spaces, UTF-8 text, no ASCII escaping) and ISO 8601
+# datetimes. They can still differ in the notation of very small or very large floats, and msgspec writes
+# a UTC offset as 'Z' where the others write '+00:00', so the output is not byte-stable across backends.
+
+def _default(value):
+    # Same datetime notation as orjson ('2024-02-02T06:06:02+00:00'); anything else as its str()
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+def _json_backend():
+    def dumps(value, sort_keys=False):
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'), sort_keys=sort_keys, default=_default)
+    return dumps, json.loads
+
+def _orjson_backend():
+    def dumps(value, sort_keys=False):
+        return orjson.dumps(value, default=str, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode('utf-8')
+    return dumps, orjson.loads
+
+def _msgspec_backend():
+    encoder = msgspec.json.Encoder(enc_hook=str)
+    sorted_encoder = msgspec.json.Encoder(enc_hook=str, order='sorted')
+    def dumps(value, sort_keys=False):
+        return (sorted_encoder if sort_keys else encoder).encode(value).decode('utf-8')
+    return dumps, msgspec.json.decode
+
+BACKENDS = {
+    'orjson': (orjson, _orjson_backend),
+    'msgspec': (msgspec, _msgspec_backend),
+    'json': (json, _json_backend),
+}
+
+class Codec:
+    def __init__(self, name=None, cache_size=4096):
+        # Pick the requested backend, or the fastest installed one (orjson, then msgspec, then json)
+        if name is None:
+            name = next(backend for backend, (module, _) in BACKENDS.items() if module is not None)
+        module, backend = BACKENDS[name]
+        if module is None:
+            raise ImportError(f"JSON backend '{name}' is not installed")
+        self.name = name
+        self._dumps, self.loads = backend()
+        self.cache_size = cache_size
+        self.cache = {}
+
+    def dumps(self, value, sort_keys=False):
+        # Encode a value to JSON text
+        return self._dumps(value, sort_keys)
+
+    @staticmethod
+    def cache_key(value):
+        # Hashable form of a list of strings (tags) or of flat string objects (categories: [{"name": ...}]),
+        # None for any other value
+        if type(value) is not list:
+            return None
+        key = []
+        for entry in value:
+            if type(entry) is str:
+                key.append(entry)
+            elif type(entry) is dict and all(type(item) is str for item in entry.values()):
+                key.append(tuple(entry.items()))
+            else:
+                return None
+        return tuple(key)
+
+    def dumps_cached(self, value):
+        # Encode a value, reusing earlier encodings of identical lists of strings or string objects
+        # (tags, categories, ...), which repeat heavily across jobs
+        key = self.cache_key(value)
+        if key is None:
+            return self._dumps(value)
+        encoded = self.cache.get(key)
+        if encoded is None:
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            encoded = self.cache[key] = self._dumps(value)
+        return encoded
+
+# Shared codec; JOBS_CODEC=json|orjson|msgspec forces a backend
+codec = Codec(os.getenv('JOBS_CODEC') or None)
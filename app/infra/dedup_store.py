@@ -0,0 +1,112 @@
+import re
+import time
+import zlib
+from itertools import islice
+
+# Values of the per-job top-level keys written before the bucketed store: presence marker, content
+# fingerprint, update_date fingerprint, or a claim ('~' + fingerprint) that was never confirmed
+LEGACY_VALUE = re.compile(r'1|[0-9a-f]{32}|None|\d{4}-\d\d-\d\d[ T][\d:.+-]+')
+LEGACY_CLAIM = '~'
+
+
+class DedupStore:
+    def __init__(self, redis, namespace='jobs:dedup', buckets=65536, ttl=0):
+        # Compact dedup cache: each req_id is a field (holding its fingerprint) of one of `buckets` hashes,
+        # <namespace>:<generation>:<bucket>, instead of a top-level key per job. Small hashes use Redis'
+        # compact encoding (up to hash-max-ziplist-entries fields, 128 by default), so size `buckets` at
+        # about a hundredth of the expected job count.
+        # With a ttl, buckets are grouped in generations of `ttl` seconds: lookups read the current and the
+        # previous generation and carry hits forward, writes go to the current one, and each generation
+        # expires one ttl after it ends. A job no crawl has seen for ttl to 2*ttl seconds is forgotten.
+        self.redis = redis
+        self.namespace = namespace
+        self.buckets = buckets
+        self.ttl = ttl
+
+    def generation(self):
+        return int(time.time() // self.ttl) if self.ttl else 0
+
+    def bucket_key(self, key, generation):
+        # crc32 rather than hash(): bucket numbers must agree across processes and hosts
+        return f"{self.namespace}:{generation}:{zlib.crc32(key.encode('utf-8')) % self.buckets:x}"
+
+    def expire_at(self, generation):
+        return (generation + 2) * self.ttl if self.ttl else 0
+
+    def claim(self, fingerprints, claim_ttl):
+        # Claim the jobs whose cached fingerprint differs from the given one (or that are not cached), in one
+        # atomic round trip; a claim lapses after claim_ttl seconds unless confirmed. Returns the claimed keys.
+        generation = self.generation()
+        previous = generation - 1 if self.ttl else generation
+        keys = list(fingerprints)
+        entries = [
+            (self.bucket_key(key, generation), self.bucket_key(key, previous), key, fingerprints[key]) for key in keys
+        ]
+        return [keys[index] for index in self.redis.claim_fields(entries, claim_ttl, self.expire_at(generation))]
+
+    def confirm(self, fingerprints):
+        # Replace claims with the fingerprints of the stored jobs
+        generation = self.generation()
+        self.redis.set_fields(
+            [(self.bucket_key(key, generation), key, fingerprint) for key, fingerprint in fingerprints.items()],
+            self.expire_at(generation)
+        )
+
+    def release(self, keys):
+        # Drop claims (in either generation they may be in) so the jobs are retried
+        generation = self.generation()
+        generations = (generation, generation - 1) if self.ttl else (generation,)
+        self.redis.delete_fields([(self.bucket_key(key, g), key) for key in keys for g in generations])
+
+    def bucket_keys(self):
+        return self.redis.scan_keys(f"{self.namespace}:*")
+
+    def stats(self, batch_size=1000):
+        # Bucket count, cached jobs and bytes used by this namespace
+        keys = entries = used = 0
+        bucket_keys = self.bucket_keys()
+        while True:
+            batch = list(islice(bucket_keys, batch_size))
+            if not batch:
+                return {'buckets': keys, 'jobs': entries, 'bytes': used}
+            keys += len(batch)
+            entries += sum(self.redis.hash_lengths(batch))
+            used += sum(self.redis.memory_usage(batch))
+
+    def clear(self, batch_size=1000):
+        # Forget every job of this namespace; returns the number of buckets deleted
+        deleted = 0
+        bucket_keys = self.bucket_keys()
+        while True:
+            batch = list(islice(bucket_keys, batch_size))
+            if not batch:
+                return deleted
+            self.redis.delete_many(batch)
+            deleted += len(batch)
+
+    def migrate(self, keys, batch_size=1000, dry_run=True):
+        # One-time move of the top-level per-job keys of earlier versions (a bare req_id holding its
+        # fingerprint) into the buckets; unconfirmed claims are dropped. Only the given `keys` (req_ids
+        # known from the stores, or the matches of an explicit pattern) are looked at, so unrelated keys
+        # of a shared db are never moved or deleted. Nothing is written unless dry_run is False.
+        # Returns (moved, dropped).
+        moved = dropped = 0
+        keys = iter(keys)
+        while True:
+            batch = [key.decode('utf-8') if isinstance(key, bytes) else key for key in islice(keys, batch_size)]
+            if not batch:
+                return moved, dropped
+            candidates = [key for key in batch if ':' not in key]
+            strings = [key for key, kind in zip(candidates, self.redis.key_types(candidates)) if kind == b'string']
+            fingerprints, claims = {}, []
+            for key, value in zip(strings, self.redis.get_many(strings)):
+                value = (value or b'').decode('utf-8', 'replace')
+                if value.startswith(LEGACY_CLAIM):
+                    claims.append(key)
+                elif LEGACY_VALUE.fullmatch(value):
+                    fingerprints[key] = value
+            if not dry_run:
+                self.confirm(fingerprints)
+                self.redis.delete_many(list(fingerprints) + claims)
+            moved += len(fingerprints)
+            dropped += len(claims)
@@ -1,28 +1,43 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, ReplaceOne, UpdateOne
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from infra.retry import with_retries
 
 class MongoDBConnector:
-    def __init__(self, host, port, database, username, password):
+    def __init__(self, host, port, database, username, password, max_pool_size=50, min_pool_size=0, retries=3):
         # Initialize MongoDB connection parameters
         self.host = host
         self.port = port
         self.database_name = database
         self.username = username
         self.password = password
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.retries = retries
         self.client = None
         self.db = None
 
     def connect(self):
         # Connect to MongoDB server, authenticate if credentials are provided
+        # The client keeps its own thread-safe connection pool and retries single writes/reads after failover
+        pool_options = {
+            'maxPoolSize': self.max_pool_size,
+            'minPoolSize': self.min_pool_size,
+            'serverSelectionTimeoutMS': 10000,
+            'retryWrites': True,
+            'retryReads': True,
+        }
         try:
             if self.username and self.password:
                 self.client = MongoClient(
                     host=self.host,
                     port=self.port,
                     username=self.username,
-                    password=self.password
+                    password=self.password,
+                    **pool_options
                 )
             else:
-                self.client = MongoClient(host=self.host, port=self.port)
+                self.client = MongoClient(host=self.host, port=self.port, **pool_options)
 
             if self.database_name:
                 self.db = self.client[self.database_name]
@@ -33,6 +48,18 @@ class MongoDBConnector:
             print(f"Error connecting to MongoDB: {e}")
             raise
 
+    def ping(self):
+        # Health check: True if the server answers
+        try:
+            self.client.admin.command('ping')
+            return True
+        except Exception:
+            return False
+
+    def retrying(self, operation):
+        # Retry an idempotent operation with backoff while the client reconnects
+        return with_retries(operation, AutoReconnect, attempts=self.retries)
+
     def insert_one(self, collection, document):
         # Insert a single document into the specified collection
         try:
@@ -42,6 +69,115 @@ class MongoDBConnector:
             print(f"Error inserting document: {e}")
             raise
 
+    def upsert_one(self, collection, document, key='req_id'):
+        # Insert a document, or replace the existing one with the same key
+        try:
+            self.retrying(lambda: self.db[collection].replace_one({key: document[key]}, document, upsert=True))
+        except Exception as e:
+            print(f"Error upserting document: {e}")
+            raise
+
+    @staticmethod
+    def _newer_filter(key, doc, newer):
+        if not newer:
+            return {key: doc[key]}
+        return {key: doc[key], '$or': [{newer: {'$lte': doc.get(newer)}}, {newer: None}]}
+
+    def bulk_upsert(self, collection, docs, key='req_id', batch_size=1000, newer=None):
+        # Upsert documents by key using unordered bulk writes of ReplaceOne operations.
+        # With `newer` (a date field), a stored document is only replaced by one at least as new.
+        upserted = modified = 0
+        try:
+            for start in range(0, len(docs), batch_size):
+                operations = [
+                    ReplaceOne(self._newer_filter(key, doc, newer), doc, upsert=True)
+                    for doc in docs[start:start + batch_size]
+                ]
+                try:
+                    result = self.retrying(lambda: self.db[collection].bulk_write(operations, ordered=False))
+                except BulkWriteError as error:
+                    # A document older than the stored one misses the filter, and its upsert then fails on
+                    # the unique key: that is the skip, anything else is a real error
+                    details = error.details
+                    if not newer or details.get('writeConcernErrors') or any(
+                        write_error['code'] != 11000 for write_error in details['writeErrors']
+                    ):
+                        raise
+                    upserted += details['nUpserted']
+                    modified += details['nModified']
+                    continue
+                upserted += result.upserted_count
+                modified += result.modified_count
+            return upserted, modified
+        except Exception as e:
+            print(f"Error bulk upserting documents: {e}")
+            raise
+
+    def insert_missing(self, collection, docs, key='_id'):
+        # Insert documents whose key is not in the collection yet; existing ones are left untouched
+        operations = [
+            UpdateOne({key: doc[key]}, {'$setOnInsert': {k: v for k, v in doc.items() if k != key}}, upsert=True)
+            for doc in docs
+        ]
+        try:
+            if operations:
+                return self.retrying(lambda: self.db[collection].bulk_write(operations, ordered=False)).upserted_count
+            return 0
+        except Exception as e:
+            print(f"Error inserting documents: {e}")
+            raise
+
+    def bulk_update(self, collection, updates):
+        # Apply (filter, update) pairs with one unordered bulk write. Returns the modified count.
+        operations = [UpdateOne(query, update) for query, update in updates]
+        try:
+            if operations:
+                return self.retrying(lambda: self.db[collection].bulk_write(operations, ordered=False)).modified_count
+            return 0
+        except Exception as e:
+            print(f"Error updating documents: {e}")
+            raise
+
+    def create_unique_index(self, collection, key='req_id'):
+        # Ensure a unique index on the key used for upserts
+        try:
+            return self.retrying(lambda: self.db[collection].create_index(key, unique=True))
+        except Exception as e:
+            print(f"Error creating index on '{key}': {e}")
+            raise
+
+    def create_index(self, collection, keys, **options):
+        # Create an index (a no-op if it already exists with the same keys and options)
+        try:
+            return self.retrying(lambda: self.db[collection].create_index(keys, **options))
+        except Exception as e:
+            print(f"Error creating index {keys}: {e}")
+            raise
+
+    def index_names(self, collection):
+        # Names of the indexes on a collection
+        try:
+            return self.retrying(lambda: list(self.db[collection].index_information()))
+        except Exception as e:
+            print(f"Error listing indexes: {e}")
+            raise
+
+    def drop_index(self, collection, name):
+        # Drop an index by name
+        try:
+            self.retrying(lambda: self.db[collection].drop_index(name))
+        except Exception as e:
+            print(f"Error dropping index '{name}': {e}")
+            raise
+
+    def update_many(self, collection, query, update):
+        # Update every matching document; `update` may be an aggregation pipeline. Returns the modified count.
+        try:
+            return self.retrying(lambda: self.db[collection].update_many(query, update).modified_count)
+        except Exception as e:
+            print(f"Error updating documents: {e}")
+            raise
+
     def fetch_all(self, collection, query={}):
         # Fetch all documents from a collection based on a query
         try:
@@ -50,6 +186,22 @@ class MongoDBConnector:
             print(f"Error fetching documents: {e}")
             raise
 
+    def iter_documents(self, collection, query=None, projection=None, batch_size=1000):
+        # Iterate over matching documents through a cursor, fetching batch_size documents per round trip
+        try:
+            return self.db[collection].find(query or {}, projection, batch_size=batch_size)
+        except Exception as e:
+            print(f"Error fetching documents: {e}")
+            raise
+
+    def aggregate(self, collection, pipeline):
+        # Run an aggregation pipeline and return the resulting documents
+        try:
+            return self.retrying(lambda: list(self.db[collection].aggregate(pipeline)))
+        except Exception as e:
+            print(f"Error running aggregation: {e}")
+            raise
+
     def close(self):
         # Close the MongoDB connection
         if self.client:
@@ -1,46 +1,234 @@
+import uuid
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2.extras import execute_values, register_default_jsonb
+from psycopg2.pool import ThreadedConnectionPool
+
+from infra.codec import codec
+from infra.retry import with_retries
+
+# Errors that mean the connection (not the statement) failed, so the operation can be retried
+TRANSIENT_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
 
 class PostgresConnector:
-    def __init__(self, database, user, password, host, port=5432):
+    def __init__(self, database, user, password, host, port=5432, pool_size=4, retries=3):
         # Initialize connection details
         self.database = database
         self.user = user
         self.password = password
         self.host = host
         self.port = port
-        self.connection = None
-        self.cursor = None
+        self.pool_size = pool_size
+        self.retries = retries
+        self.pool = None
+
+    def connect(self):
+        # Create a thread-safe connection pool; connections are borrowed per operation.
+        # jsonb values read back are decoded with the shared codec.
+        register_default_jsonb(globally=True, loads=codec.loads)
+        self.pool = with_retries(
+            lambda: ThreadedConnectionPool(
+                minconn=1,
+                maxconn=self.pool_size,
+                database=self.database,
+                user=self.user,
+                password=self.password,
+                host=self.host,
+                port=self.port
+            ),
+            TRANSIENT_ERRORS,
+            attempts=self.retries
+        )
+
+    def acquire(self):
+        # Take a pooled connection, replacing it if it is already known to be closed
+        if not self.pool:
+            raise Exception("Connection not established.")
+        connection = self.pool.getconn()
+        if connection.closed:
+            self.pool.putconn(connection, close=True)
+            connection = self.pool.getconn()
+        return connection
+
+    def release(self, connection):
+        # Return a connection to the pool; connections that broke while in use are discarded
+        self.pool.putconn(connection, close=bool(connection.closed))
+
+    @contextmanager
+    def borrow(self):
+        # Lend a pooled connection for the duration of a with-block
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def run(self, operation):
+        # Run operation(connection) in its own transaction, retrying with backoff if the connection drops
+        def attempt():
+            with self.borrow() as connection:
+                try:
+                    result = operation(connection)
+                    connection.commit()
+                    return result
+                except Exception:
+                    if not connection.closed:
+                        connection.rollback()
+                    raise
+
+        return with_retries(attempt, TRANSIENT_ERRORS, attempts=self.retries)
 
-    def fetch_data(self, query):
+    def ping(self):
+        # Health check: True if the server answers on a pooled connection
+        try:
+            return self.fetch_data("SELECT 1") == [(1,)]
+        except Exception:
+            return False
+
+    def fetch_data(self, query, params=None):
         # Fetch data from the database
+        def fetch(connection):
+            with connection.cursor() as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+
         try:
-            self.cursor.execute(query)
-            return self.cursor.fetchall()
+            return self.run(fetch)
         except Exception as error:
             print(f"Error fetching data: {error}")
             raise
 
-    def connect(self):
-        # Establish connection to the database
-        self.connection = psycopg2.connect(
-            database=self.database,
-            user=self.user,
-            password=self.password,
-            host=self.host,
-            port=self.port
-        )
-        self.cursor = self.connection.cursor()
+    def stream_data(self, query, params=None, itersize=2000):
+        # Run a query on a named server-side cursor; returns (column names, row iterator)
+        # and fetches `itersize` rows per round trip instead of loading the result at once.
+        # The pooled connection is held until the iterator is exhausted or closed.
+        connection = self.acquire()
+        cursor = connection.cursor(name=f"stream_{uuid.uuid4().hex}")
+        cursor.itersize = itersize
+
+        def release():
+            try:
+                if not connection.closed:
+                    connection.rollback()  # Ends the read-only transaction and drops the server-side cursor
+            finally:
+                self.release(connection)
+
+        try:
+            cursor.execute(query, params)
+            first = cursor.fetchone()  # The description is only available after the first fetch
+            headers = [desc[0] for desc in cursor.description]
+        except Exception as error:
+            release()
+            print(f"Error fetching data: {error}")
+            raise
+
+        def rows():
+            try:
+                if first is not None:
+                    yield first
+                    yield from cursor
+            finally:
+                release()
+
+        return headers, rows()
+
+    def copy_to(self, query, file, params=None):
+        # Stream a query result to a file object as CSV with a header row (COPY ... TO STDOUT)
+        def copy(connection):
+            with connection.cursor() as cursor:
+                statement = query
+                if params:
+                    statement = cursor.mogrify(query, params).decode()  # COPY does not take bind parameters
+                cursor.copy_expert(f"COPY ({statement.rstrip().rstrip(';')}) TO STDOUT WITH CSV HEADER", file)
+
+        try:
+            # Not retried: part of the output may already have been written to the file
+            with self.borrow() as connection:
+                try:
+                    copy(connection)
+                finally:
+                    if not connection.closed:
+                        connection.rollback()
+        except Exception as error:
+            print(f"Error copying data: {error}")
+            raise
 
     def execute(self, query, params=None):
         # Execute a query (insert, update, delete)
-        if not self.connection:
-            raise Exception("Connection not established.")
-        self.cursor.execute(query, params)
-        self.connection.commit()
+        def execute(connection):
+            with connection.cursor() as cursor:
+                cursor.execute(query, params)
+
+        self.run(execute)
+
+    def execute_all(self, queries):
+        # Execute several queries in a single transaction
+        def execute(connection):
+            with connection.cursor() as cursor:
+                for query in queries:
+                    cursor.execute(query)
+
+        self.run(execute)
+
+    def upsert_many(self, table, columns, rows, key, page_size=500, newer=None):
+        # Insert or update many rows in a single transaction, keyed on a unique column.
+        # With `newer` (a timestamp column), a stored row is only replaced by one at least as new.
+        query = self._upsert_query(table, columns, key, "%s", newer)
+
+        def upsert(connection):
+            with connection.cursor() as cursor:
+                execute_values(cursor, query, rows, page_size=page_size)
+
+        self.run(upsert)
+
+    def insert_missing(self, table, columns, rows, key, page_size=500):
+        # Insert many rows in a single transaction, skipping rows whose key already exists
+        column_list = ", ".join(f'"{column}"' for column in columns)
+        query = f'INSERT INTO "{table}" ({column_list}) VALUES %s ON CONFLICT ("{key}") DO NOTHING'
+
+        def insert(connection):
+            with connection.cursor() as cursor:
+                execute_values(cursor, query, rows, page_size=page_size)
+
+        self.run(insert)
+
+    def update_many(self, table, key, columns, rows, page_size=500):
+        # Update columns of existing rows from (key, value, ...) tuples in a single transaction
+        assignments = ", ".join(f'"{column}" = v."{column}"' for column in columns)
+        names = ", ".join(f'"{column}"' for column in [key] + list(columns))
+        query = f'UPDATE "{table}" AS t SET {assignments} FROM (VALUES %s) AS v ({names}) WHERE t."{key}" = v."{key}"'
+
+        def update(connection):
+            with connection.cursor() as cursor:
+                execute_values(cursor, query, rows, page_size=page_size)
+
+        self.run(update)
+
+    def upsert(self, table, columns, row, key):
+        # Insert or update a single row, keyed on a unique column
+        placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        query = self._upsert_query(table, columns, key, placeholders)
+
+        def upsert(connection):
+            with connection.cursor() as cursor:
+                cursor.execute(query, row)
+
+        self.run(upsert)
+
+    @staticmethod
+    def _upsert_query(table, columns, key, values, newer=None):
+        # Build an INSERT ... ON CONFLICT DO UPDATE statement for the given columns
+        column_list = ", ".join(f'"{column}"' for column in columns)
+        updates = ", ".join(f'"{column}" = EXCLUDED."{column}"' for column in columns if column != key)
+        condition = f' WHERE "{table}"."{newer}" IS NULL OR "{table}"."{newer}" <= EXCLUDED."{newer}"' if newer else ''
+        return (
+            f'INSERT INTO "{table}" ({column_list}) VALUES {values} '
+            f'ON CONFLICT ("{key}") DO UPDATE SET {updates}{condition}'
+        )
 
     def close(self):
-        # Close the cursor and connection
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
\ No newline at end of file
+        # Close every pooled connection
+        if self.pool:
+            self.pool.closeall()
+            self.pool = None
@@ -0,0 +1,42 @@
+import hashlib
+
+from infra.codec import codec
+
+
+class QueryCache:
+    def __init__(self, redis, namespace='jobs:query', ttl=300, max_bytes=1024 * 1024, max_entries=10000):
+        # Cache of query results in Redis, keyed by the normalized query and the data version.
+        # Writers bump the version when jobs change, which retires every cached result at once;
+        # retired entries are never read again and expire after `ttl` seconds.
+        self.redis = redis
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.version_key = f"{namespace}:version"
+
+    def version(self):
+        return int(self.redis.get(self.version_key) or 0)
+
+    def bump(self):
+        # Invalidate every cached result (called after new or changed jobs are stored)
+        return self.redis.incr(self.version_key)
+
+    def key(self, version, query):
+        digest = hashlib.sha1(codec.dumps(query, sort_keys=True).encode('utf-8')).hexdigest()
+        return f"{self.namespace}:{version}:{digest}"
+
+    def cached(self, query, compute):
+        # Return (result, hit): the cached result for `query` (a JSON-able dict), or compute() stored for next time.
+        # Results larger than max_bytes are returned but not cached.
+        version = self.version()
+        key = self.key(version, query)
+        payload = self.redis.get(key)
+        if payload is not None:
+            return codec.loads(payload), True
+
+        result = compute()
+        payload = codec.dumps(result)
+        if len(payload) <= self.max_bytes:
+            self.redis.set_tracked(key, payload, self.ttl, f"{self.namespace}:{version}:index", self.max_entries)
+        return result, False
@@ -1,16 +1,93 @@
+import threading
+import time
+
 import redis
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, TimeoutError
+from redis.retry import Retry
+
+# Claims every job whose cached fingerprint differs from the given one and is not already claimed by
+# another crawl. Jobs are fields of hash buckets (see infra.dedup_store); a claim is stored as
+# '~<deadline>:<fingerprint>' (deadline in Redis server seconds) since hash fields cannot expire on their own.
+# KEYS: current and previous bucket of each job, in pairs; ARGV[1]: claim TTL, ARGV[2]: EXPIREAT of the
+# current bucket (0: none), ARGV[3..]: field and fingerprint of each job. A job found only in the previous
+# bucket is carried into the current one. Returns the 1-based indexes claimed.
+CLAIM_FIELDS_SCRIPT = """
+local now = tonumber(redis.call('TIME')[1])
+local claim_ttl, expire_at = tonumber(ARGV[1]), tonumber(ARGV[2])
+local claimed = {}
+for i = 1, #KEYS / 2 do
+    local current, previous = KEYS[2 * i - 1], KEYS[2 * i]
+    local field, fingerprint = ARGV[2 * i + 1], ARGV[2 * i + 2]
+    local value = redis.call('HGET', current, field)
+    local carried = false
+    if not value and previous ~= current then
+        value = redis.call('HGET', previous, field)
+        carried = value and true or false
+    end
+    local claimable
+    if value and string.sub(value, 1, 1) == '~' then
+        claimable = (tonumber(string.match(value, '^~(%d+)')) or 0) < now
+    else
+        claimable = value ~= fingerprint
+    end
+    if claimable then
+        redis.call('HSET', current, field, '~' .. (now + claim_ttl) .. ':' .. fingerprint)
+        claimed[#claimed + 1] = i
+    elseif carried then
+        redis.call('HSET', current, field, value)
+    end
+    if (claimable or carried) and expire_at > 0 then
+        redis.call('EXPIREAT', current, expire_at)
+    end
+end
+return claimed
+"""
 
 class RedisConnector:
-    def __init__(self, host, port=6379, db=0):
+    # Connection pools shared by every connector pointing at the same server and db
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, host, port=6379, db=0, max_connections=16, retries=3, health_check_interval=30):
         # Initialize connection parameters
         self.host = host
         self.port = port
         self.db = db
+        self.max_connections = max_connections
+        self.retries = retries
+        self.health_check_interval = health_check_interval
         self.connection = None
 
     def connect(self):
-        # Establish connection to the Redis server
-        self.connection = redis.Redis(host=self.host, port=self.port, db=self.db)
+        # Establish connection to the Redis server through the shared pool
+        self.connection = redis.Redis(connection_pool=self.shared_pool())
+        self.claim_fields_script = self.connection.register_script(CLAIM_FIELDS_SCRIPT)
+
+    def shared_pool(self):
+        # Reuse one ConnectionPool per (host, port, db); connections reconnect with exponential backoff
+        key = (self.host, self.port, self.db)
+        with self._pools_lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = redis.ConnectionPool(
+                    host=self.host,
+                    port=self.port,
+                    db=self.db,
+                    max_connections=self.max_connections,
+                    health_check_interval=self.health_check_interval,
+                    retry=Retry(ExponentialBackoff(cap=8, base=0.5), self.retries),
+                    retry_on_error=[ConnectionError, TimeoutError]
+                )
+                self._pools[key] = pool
+            return pool
+
+    def ping(self):
+        # Health check: True if the server answers
+        try:
+            return bool(self.connection.ping())
+        except Exception:
+            return False
 
     def exists(self, key):
         # Check if the key exists in Redis
@@ -20,7 +97,134 @@ class RedisConnector:
         # Set a value for a key in Redis
         self.connection.set(key, value)
 
+    def get(self, key):
+        # Get the value of a key (None if missing)
+        return self.connection.get(key)
+
+    def incr(self, key):
+        # Atomically increment a counter key; returns the new value
+        return self.connection.incr(key)
+
+    def set_tracked(self, key, value, ttl, index, max_entries):
+        # Set a key with an expiry and record it in the `index` sorted set (scored by time); once the
+        # index holds more than max_entries keys, the oldest are deleted. One pipelined round trip.
+        pipe = self.connection.pipeline(transaction=False)
+        pipe.set(key, value, ex=ttl)
+        pipe.zadd(index, {key: time.time()})
+        pipe.expire(index, ttl)
+        pipe.zcard(index)
+        size = pipe.execute()[-1]
+        if size > max_entries:
+            evicted = [member for member, _ in self.connection.zpopmin(index, size - max_entries)]
+            if evicted:
+                self.connection.delete(*evicted)
+
+    def claim_fields(self, entries, claim_ttl, expire_at=0):
+        # Claim job fields in one atomic round trip: `entries` are (current key, previous key, field, fingerprint)
+        # tuples. Returns the indexes (0-based) of the claimed entries.
+        if not entries:
+            return []
+        keys = [key for current, previous, _, _ in entries for key in (current, previous)]
+        args = [claim_ttl, expire_at] + [value for _, _, field, fingerprint in entries for value in (field, fingerprint)]
+        return [index - 1 for index in self.claim_fields_script(keys=keys, args=args)]
+
+    def set_fields(self, entries, expire_at=0):
+        # Set (key, field, value) hash fields in one pipelined round trip, then EXPIREAT each key touched
+        if not entries:
+            return
+        pipe = self.connection.pipeline(transaction=False)
+        for key, field, value in entries:
+            pipe.hset(key, field, value)
+        if expire_at:
+            for key in {key for key, _, _ in entries}:
+                pipe.expireat(key, expire_at)
+        pipe.execute()
+
+    def delete_fields(self, entries):
+        # Delete (key, field) hash fields in one pipelined round trip
+        if not entries:
+            return
+        pipe = self.connection.pipeline(transaction=False)
+        for key, field in entries:
+            pipe.hdel(key, field)
+        pipe.execute()
+
+    def scan_keys(self, pattern=None, count=1000):
+        # Iterate over the keys of the db (matching `pattern`) without blocking the server
+        return self.connection.scan_iter(match=pattern, count=count)
+
+    def key_types(self, keys):
+        # TYPE of many keys in one pipelined round trip
+        pipe = self.connection.pipeline(transaction=False)
+        for key in keys:
+            pipe.type(key)
+        return pipe.execute()
+
+    def get_many(self, keys):
+        # Values of many string keys in one round trip (None where missing)
+        if not keys:
+            return []
+        return self.connection.mget(keys)
+
+    def hash_lengths(self, keys):
+        # Field count of many hashes in one pipelined round trip
+        pipe = self.connection.pipeline(transaction=False)
+        for key in keys:
+            pipe.hlen(key)
+        return pipe.execute()
+
+    def memory_usage(self, keys):
+        # Bytes used by many keys (MEMORY USAGE) in one pipelined round trip
+        pipe = self.connection.pipeline(transaction=False)
+        for key in keys:
+            pipe.memory_usage(key)
+        return [usage or 0 for usage in pipe.execute()]
+
+    def delete_many(self, keys):
+        # Delete many keys in one round trip
+        if keys:
+            self.connection.delete(*keys)
+
+    def push_many(self, key, values, chunk_size=1000):
+        # Append values to the tail of a list
+        for start in range(0, len(values), chunk_size):
+            self.connection.rpush(key, *values[start:start + chunk_size])
+
+    def move_many(self, source, destination, count=1):
+        # Atomically move up to `count` values from the head of one list to the tail of another
+        # (LMOVE), in one pipelined round trip; returns the moved values
+        pipe = self.connection.pipeline(transaction=False)
+        for _ in range(count):
+            pipe.lmove(source, destination, 'LEFT', 'RIGHT')
+        return [value for value in pipe.execute() if value is not None]
+
+    def requeue(self, source, destination):
+        # Move every value of `source` back to the head of `destination`, keeping their order
+        moved = 0
+        while self.connection.lmove(source, destination, 'RIGHT', 'LEFT') is not None:
+            moved += 1
+        return moved
+
+    def move_to_set(self, source, value, destination):
+        # Remove a value from a list and add it to a set, atomically (MULTI/EXEC)
+        pipe = self.connection.pipeline(transaction=True)
+        pipe.lrem(source, 1, value)
+        pipe.sadd(destination, value)
+        pipe.execute()
+
+    def members_many(self, key, values):
+        # Set membership of many values in one round trip
+        if not values:
+            return []
+        return [bool(found) for found in self.connection.smismember(key, values)]
+
+    def list_length(self, key):
+        return self.connection.llen(key)
+
+    def set_size(self, key):
+        return self.connection.scard(key)
+
     def close(self):
-        # Close the Redis connection
+        # Release this client; the shared pool stays open for other connectors
         if self.connection:
             self.connection.close()
\ No newline at end of file
@@ -0,0 +1,21 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+def with_retries(operation, retry_on, attempts=3, base_delay=0.5, max_delay=8.0, on_retry=None):
+    # Call operation(), retrying transient errors with exponential backoff.
+    # on_retry (e.g. a reconnect) runs before each new attempt. The backoff sleeps the calling thread,
+    # which is why the pipelines run their store writes and Redis round trips on worker threads rather
+    # than the reactor's.
+    for attempt in range(attempts):
+        try:
+            return operation()
+        except retry_on as error:
+            if attempt == attempts - 1:
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt)
+            logger.warning(f"Transient error ({error}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+            if on_retry:
+                on_retry()
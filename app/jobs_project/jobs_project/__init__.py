@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Make the shared infra package (app/infra) importable from the Scrapy project
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
@@ -0,0 +1,152 @@
+from datetime import datetime
+from itertools import islice
+
+from jobs_project.geo import geohash
+
+from jobs_project.schema import (
+    CONTENT_FIELDS, GEOHASH_FIELD, JOB_FIELDS, KEY_FIELD, LOCATION_FIELD, SEARCH_COLUMN, content_hash, content_table, create_content_tables_sql,
+    create_index_sql, create_rollup_tables_sql, create_table_sql, index_name, migrate_table_sql, mongo_index_specs,
+    rebuild_rollups_sql, rollup_signature, rollup_table, rollup_trigger_sql, search_trigger_sql
+)
+
+# Every managed Mongo index name starts with this; other indexes on the collection are left alone
+MONGO_INDEX_PREFIX = 'jobs_'
+
+
+def bootstrap_postgres(postgresql, table, logger=None):
+    # Create the job table, bring an existing one up to the schema and sync its managed indexes.
+    # Safe to run on every start: each step only changes what differs from the schema.
+    postgresql.execute(create_table_sql(table))
+    for statement in create_content_tables_sql(table):
+        postgresql.execute(statement)
+
+    existing = dict(postgresql.fetch_data(
+        "SELECT column_name, data_type FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = %s",
+        (table,)
+    ))
+    for statement in migrate_table_sql(table, existing):
+        if logger:
+            logger.info(f"Migrating {table}: {statement}")
+        postgresql.execute(statement)
+    for statement in search_trigger_sql(table):
+        postgresql.execute(statement)
+    backfill_geohash(postgresql, table, logger)
+    bootstrap_rollups(postgresql, table, logger)
+
+    wanted = create_index_sql(table)
+    for statement in wanted.values():
+        postgresql.execute(statement)
+
+    # Drop managed indexes whose field is no longer indexed in the schema
+    managed = {index_name(table, name) for name in [job_field.name for job_field in JOB_FIELDS] + [SEARCH_COLUMN]}
+    indexes = postgresql.fetch_data(
+        "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s",
+        (table,)
+    )
+    for (name,) in indexes:
+        if name in managed and name not in wanted:
+            if logger:
+                logger.info(f"Dropping index {name} no longer in the schema")
+            postgresql.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def backfill_geohash(postgresql, table, logger=None, batch_size=5000):
+    # Rows written before the geohash column have coordinates but no cell; compute theirs in batches
+    # (a no-op once every row has one, answered by the geohash index)
+    filled = 0
+    while True:
+        rows = postgresql.fetch_data(
+            f"SELECT {KEY_FIELD}, latitude, longitude FROM {table} WHERE {GEOHASH_FIELD} IS NULL "
+            f"AND latitude BETWEEN -90 AND 90 AND longitude BETWEEN -180 AND 180 LIMIT %s",
+            (batch_size,)
+        )
+        if not rows:
+            break
+        postgresql.update_many(table, KEY_FIELD, [GEOHASH_FIELD], [
+            (key, geohash(latitude, longitude)) for key, latitude, longitude in rows
+        ], page_size=batch_size)
+        filled += len(rows)
+    if filled and logger:
+        logger.info(f"Computed the geohash of {filled} {table} rows")
+
+
+def bootstrap_rollups(postgresql, table, logger=None):
+    # Rollup tables and the triggers maintaining them. The rollups are recomputed from the table once, when
+    # they are new or aggregate other fields than the schema says (the signature comment tells)
+    for statement in create_rollup_tables_sql(table) + rollup_trigger_sql(table):
+        postgresql.execute(statement)
+    current = postgresql.fetch_data(
+        "SELECT obj_description(to_regclass(%s), 'pg_class')", (rollup_table(table, 'counts'),)
+    )
+    if not current or current[0][0] != rollup_signature():
+        if logger:
+            logger.info(f"Rebuilding the rollups of {table}")
+        postgresql.execute_all(rebuild_rollups_sql(table))
+
+
+def bootstrap_mongo(mongodb, collection, logger=None):
+    # Indexes matching the table's, typed dates, and the unique req_id index used by upserts
+    # (last, since it fails on a collection that already holds duplicate req_ids)
+    wanted = mongo_index_specs()
+    for name, keys in wanted.items():
+        mongodb.create_index(collection, keys, name=name)
+    for name in mongodb.index_names(collection):
+        if name.startswith(MONGO_INDEX_PREFIX) and name not in wanted:
+            mongodb.drop_index(collection, name)
+
+    # Documents written before the dates were typed hold them as strings; convert those in place
+    for job_field in JOB_FIELDS:
+        if job_field.type is not datetime:
+            continue
+        converted = mongodb.update_many(
+            collection,
+            {job_field.name: {'$type': 'string'}},
+            [{'$set': {job_field.name: {
+                '$dateFromString': {'dateString': f"${job_field.name}", 'onError': f"${job_field.name}"}
+            }}}]
+        )
+        if converted and logger:
+            logger.info(f"Converted {job_field.name} to a date in {converted} {collection} documents")
+
+    # Documents written before the 2dsphere index have coordinates but no GeoJSON point
+    located = mongodb.update_many(
+        collection,
+        {
+            LOCATION_FIELD: {'$exists': False},
+            'latitude': {'$type': 'number', '$gte': -90, '$lte': 90},
+            'longitude': {'$type': 'number', '$gte': -180, '$lte': 180},
+        },
+        [{'$set': {LOCATION_FIELD: {'type': 'Point', 'coordinates': ['$longitude', '$latitude']}}}]
+    )
+    if located and logger:
+        logger.info(f"Added a {LOCATION_FIELD} point to {located} {collection} documents")
+
+    migrate_mongo_contents(mongodb, collection, logger)
+    mongodb.create_unique_index(collection, KEY_FIELD)
+
+
+def migrate_mongo_contents(mongodb, collection, logger=None, batch_size=1000):
+    # Documents written before CONTENT_FIELDS hold the contents inline: move them to the side
+    # collections a batch at a time and leave the hash in their place
+    for name, hash_name in CONTENT_FIELDS.items():
+        migrated = 0
+        while True:
+            cursor = mongodb.iter_documents(collection, {name: {'$exists': True}}, {name: 1}, batch_size=batch_size)
+            try:
+                documents = list(islice(cursor, batch_size))
+            finally:
+                cursor.close()
+            if not documents:
+                break
+            contents = {content_hash(doc[name]): doc[name] for doc in documents if doc.get(name) is not None}
+            mongodb.insert_missing(content_table(collection, name), [
+                {'_id': digest, name: value} for digest, value in contents.items()
+            ])
+            mongodb.bulk_update(collection, [
+                ({'_id': doc['_id']}, {'$set': {hash_name: content_hash(doc.get(name))}, '$unset': {name: ''}})
+                for doc in documents
+            ])
+            migrated += len(documents)
+        if migrated and logger:
+            logger.info(f"Moved {name} of {migrated} {collection} documents to {content_table(collection, name)}")
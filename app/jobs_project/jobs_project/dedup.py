@@ -0,0 +1,153 @@
+import argparse
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime
+
+from jobs_project.schema import CONTENT_FIELDS, build_document, content_table
+
+# Fingerprint stored for every job in presence mode, where any cached req_id counts as a duplicate
+PRESENT = '1'
+
+
+def canonical_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot fingerprint a {type(value).__name__}")
+
+
+def fingerprint(record, mode='presence'):
+    # Value cached per req_id; a job is rewritten only when this changes.
+    # 'content' hashes every field, 'update_date' trusts the feed's update timestamp.
+    # Content is encoded with the stdlib json module rather than the shared codec: the codec's backends
+    # render datetimes and some floats differently, and installing one must not change every fingerprint.
+    if mode == 'content':
+        payload = json.dumps(build_document(record), sort_keys=True, ensure_ascii=False, separators=(',', ':'),
+                             default=canonical_default)
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+    if mode == 'update_date':
+        return str(record.update_date)
+    return PRESENT
+
+
+class RecentIds:
+    def __init__(self, maxsize=100000):
+        # Bounded LRU of req_ids seen during this crawl, so repeats never reach Redis
+        self.maxsize = maxsize
+        self.ids = OrderedDict()
+
+    def seen(self, key, value=None):
+        # Return True if the key was seen recently with the same value; otherwise remember it and return False
+        if key in self.ids and self.ids[key] == value:
+            self.ids.move_to_end(key)
+            return True
+        self.ids[key] = value
+        self.ids.move_to_end(key)
+        if len(self.ids) > self.maxsize:
+            self.ids.popitem(last=False)
+        return False
+
+    def discard(self, key):
+        # Forget a key so a later occurrence is processed again
+        self.ids.pop(key, None)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class ContentStore:
+    def __init__(self, write, cache_size=100000):
+        # Writes the content-addressed fields of jobs (CONTENT_FIELDS) once per distinct value.
+        # `write({field: {hash: value}})` must insert-if-missing; hashes already written are remembered,
+        # so a templated description is sent to the store once per crawl rather than once per job.
+        self.write = write
+        self.stored = RecentIds(cache_size)
+
+    def store(self, records):
+        # Write the contents of `records` not written yet; returns how many values were written
+        contents = {}
+        for name, hash_name in CONTENT_FIELDS.items():
+            new = {}
+            for record in records:
+                digest = getattr(record, hash_name)
+                if digest is not None and digest not in new and not self.stored.seen((name, digest)):
+                    new[digest] = getattr(record, name)
+            if new:
+                contents[name] = new
+        if not contents:
+            return 0
+        try:
+            self.write(contents)
+        except Exception:
+            for name, new in contents.items():
+                for digest in new:
+                    self.stored.discard((name, digest))
+            raise
+        return sum(len(new) for new in contents.values())
+
+
+def write_postgres_contents(postgresql, table, contents):
+    for name, values in contents.items():
+        postgresql.insert_missing(content_table(table, name), ('hash', name), list(values.items()), 'hash',
+                                  page_size=len(values))
+
+
+def write_mongo_contents(mongodb, collection, contents):
+    for name, values in contents.items():
+        mongodb.insert_missing(content_table(collection, name), [
+            {'_id': digest, name: value} for digest, value in values.items()
+        ])
+
+
+if __name__ == "__main__":
+    from infra.dedup_store import DedupStore
+    from jobs_project.feed_queue import redis_from_env
+    from jobs_project.schema import KEY_FIELD
+
+    parser = argparse.ArgumentParser(description="Inspect, clear or migrate the Redis dedup cache.")
+    parser.add_argument('command', choices=['stats', 'clear', 'migrate'],
+                        help="migrate moves the per-job keys of earlier versions into the buckets (run it once, "
+                             "with no crawl running)")
+    parser.add_argument('--namespace', default='jobs:dedup', help="DEDUP_NAMESPACE")
+    parser.add_argument('--buckets', type=int, default=65536, help="DEDUP_BUCKETS")
+    parser.add_argument('--ttl', type=int, default=2592000, help="DEDUP_TTL")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--from-postgres', action='store_true',
+                        help="migrate: only look at the keys named after a req_id of raw_table")
+    source.add_argument('--pattern', help="migrate: only look at the keys matching this SCAN pattern, e.g. '*BR'")
+    parser.add_argument('--apply', action='store_true',
+                        help="migrate: move and delete the keys (by default they are only counted)")
+    args = parser.parse_args()
+    if args.command == 'migrate' and not (args.from_postgres or args.pattern):
+        parser.error("migrate needs --from-postgres or --pattern to tell req_id keys from other data in the db")
+
+    redis = redis_from_env()
+    postgresql = None
+    try:
+        store = DedupStore(redis, args.namespace, args.buckets, args.ttl)
+        if args.command == 'stats':
+            print(store.stats())
+        elif args.command == 'clear':
+            print(f"Deleted {store.clear()} buckets of {args.namespace}")
+        else:
+            if args.from_postgres:
+                from infra.postgresql_connector import PostgresConnector
+
+                postgresql = PostgresConnector(
+                    host=os.getenv('POSTGRES_HOST'), port=int(os.getenv('POSTGRES_PORT')),
+                    user=os.getenv('POSTGRES_USER'), password=os.getenv('POSTGRES_PASSWORD'),
+                    database=os.getenv('POSTGRES_DB'),
+                )
+                postgresql.connect()
+                _, rows = postgresql.stream_data(f"SELECT {KEY_FIELD} FROM raw_table")
+                keys = (row[0] for row in rows)
+            else:
+                keys = redis.scan_keys(args.pattern)
+            moved, dropped = store.migrate(keys, dry_run=not args.apply)
+            print(f"{'Moved' if args.apply else 'Would move'} {moved} job keys into {args.namespace}, "
+                  f"{'dropped' if args.apply else 'would drop'} {dropped} unconfirmed claims")
+    finally:
+        redis.close()
+        if postgresql is not None:
+            postgresql.close()
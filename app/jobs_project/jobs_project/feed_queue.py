@@ -0,0 +1,87 @@
+import argparse
+import glob
+import os
+import socket
+from pathlib import Path
+
+from infra.redis_connector import RedisConnector
+
+
+class FeedQueue:
+    def __init__(self, redis, key='jobs:feeds', worker_id=None):
+        # Shared queue of feed URLs in Redis, consumed by any number of crawl workers:
+        #   <key>:pending               list of feeds waiting for a worker
+        #   <key>:processing:<worker>   feeds a worker has taken but not finished
+        #   <key>:done / <key>:failed   sets of finished feeds
+        self.redis = redis
+        self.worker_id = worker_id or socket.gethostname()
+        self.pending = f"{key}:pending"
+        self.processing = f"{key}:processing:{self.worker_id}"
+        self.done = f"{key}:done"
+        self.failed = f"{key}:failed"
+
+    def push(self, urls):
+        # Queue feeds that are not finished yet; returns how many were queued
+        urls = list(dict.fromkeys(urls))
+        finished = self.redis.members_many(self.done, urls)
+        queued = [url for url, is_done in zip(urls, finished) if not is_done]
+        self.redis.push_many(self.pending, queued)
+        return len(queued)
+
+    def resume(self):
+        # Put feeds this worker had taken before it stopped back at the head of the queue
+        return self.redis.requeue(self.processing, self.pending)
+
+    def take(self, count=1):
+        # Take up to `count` feeds; they stay in this worker's processing list until finished
+        return [url.decode('utf-8') for url in self.redis.move_many(self.pending, self.processing, count)]
+
+    def finish(self, url):
+        self.redis.move_to_set(self.processing, url, self.done)
+
+    def fail(self, url):
+        self.redis.move_to_set(self.processing, url, self.failed)
+
+    def status(self):
+        return {
+            'pending': self.redis.list_length(self.pending),
+            'done': self.redis.set_size(self.done),
+            'failed': self.redis.set_size(self.failed),
+        }
+
+
+def feed_urls(sources):
+    # file:// URLs for local paths and glob patterns; anything with a scheme is passed through
+    for source in sources:
+        if '://' in source:
+            yield source
+            continue
+        for path in sorted(glob.glob(source, recursive=True)) or [source]:
+            yield Path(path).resolve().as_uri()
+
+
+def redis_from_env():
+    # Same Redis the pipeline uses for dedup
+    redis = RedisConnector(host=os.getenv('REDIS_HOST'), port=int(os.getenv('REDIS_PORT', 6379)), db=os.getenv('REDIS_DB', 0))
+    redis.connect()
+    return redis
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the shared feed queue used by distributed crawls.")
+    parser.add_argument('--key', default='jobs:feeds', help="Redis key prefix (FEED_QUEUE_KEY)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    push = commands.add_parser('push', help="Queue feed files, glob patterns or URLs")
+    push.add_argument('sources', nargs='+')
+    commands.add_parser('status', help="Show pending, done and failed feed counts")
+    args = parser.parse_args()
+
+    redis = redis_from_env()
+    try:
+        queue = FeedQueue(redis, args.key)
+        if args.command == 'push':
+            print(f"Queued {queue.push(feed_urls(args.sources))} feeds")
+        else:
+            print(queue.status())
+    finally:
+        redis.close()
@@ -0,0 +1,108 @@
+import codecs
+import json
+import re
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class FeedReader:
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        # Incrementally decode a byte stream holding one JSON object
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        # Append the next chunk to the buffer, dropping text that was already consumed.
+        # The read size grows with the pending text so one large value is not re-parsed quadratically.
+        if self.eof:
+            return False
+        pending = self.buffer[self.pos:]
+        chunk = self.stream.read(max(self.chunk_size, len(pending)))
+        if chunk:
+            text = self.text_decoder.decode(chunk)
+        else:
+            self.eof = True
+            text = self.text_decoder.decode(b'', final=True)
+        self.buffer = pending + text
+        self.pos = 0
+        return bool(chunk or text)
+
+    def peek(self):
+        # Return the next non-whitespace character without consuming it ('' at the end of the stream)
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char):
+        # Consume the next non-whitespace character, which must be `char`
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON feed, found {found!r}")
+        self.pos += 1
+
+    def decode_value(self):
+        # Decode the next complete JSON value, reading more of the stream until it is complete
+        self.peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A number cut off at the buffer edge (e.g. "2." of "2.5") continues in the next chunk
+            if end == len(self.buffer) or (isinstance(value, (int, float)) and self.buffer[end] in '.eE+-'):
+                if self.fill():
+                    continue
+            self.pos = end
+            return value
+
+    def seek_array(self, key):
+        # Walk the top-level object up to the array stored under `key`; False if it is missing.
+        # Values stored under other keys before it are decoded and discarded.
+        self.expect('{')
+        if self.peek() == '}':
+            return False
+        while True:
+            name = self.decode_value()
+            self.expect(':')
+            if name == key:
+                if self.peek() != '[':
+                    return False
+                self.pos += 1
+                return True
+            self.decode_value()
+            if self.peek() != ',':
+                return False
+            self.pos += 1
+
+    def iter_array(self):
+        # Yield the elements of the array opened by seek_array, one at a time
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            found = self.peek()
+            self.pos += 1
+            if found == ']':
+                return
+            if found != ',':
+                raise ValueError(f"Expected ',' or ']' in JSON feed, found {found!r}")
+
+
+def iter_jobs(stream, key='jobs', chunk_size=CHUNK_SIZE):
+    # Yield each entry of the feed's `jobs` array as soon as it has been read,
+    # so only one job's object tree is held in memory at a time.
+    reader = FeedReader(stream, chunk_size)
+    if reader.seek_array(key):
+        yield from reader.iter_array()
@@ -0,0 +1,94 @@
+import math
+
+# Geohash cells: each base32 character splits a cell into 32, alternating longitude and latitude bits,
+# so every prefix of a job's geohash is a coarser cell containing it and a cell is a B-tree prefix range
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 9  # Stored per job: cells of about 5 x 5 m
+MAX_CELLS = 16  # Cells a radius or box query is pruned with; larger areas use coarser cells
+EARTH_RADIUS_KM = 6371.0088
+
+
+def valid_coordinates(lat, lon):
+    # (lat, lon) as floats, or None when missing or out of range
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def geohash(lat, lon, precision=PRECISION):
+    # Geohash of a point ('9q8yyk8yt' for San Francisco), None without valid coordinates
+    coordinates = valid_coordinates(lat, lon)
+    if coordinates is None:
+        return None
+    lat, lon = coordinates
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        value_range, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        middle = (value_range[0] + value_range[1]) / 2
+        if coordinate >= middle:
+            value = value * 2 + 1
+            value_range[0] = middle
+        else:
+            value *= 2
+            value_range[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def point(lat, lon):
+    # GeoJSON point for a MongoDB 2dsphere index, None without valid coordinates
+    coordinates = valid_coordinates(lat, lon)
+    if coordinates is None:
+        return None
+    return {'type': 'Point', 'coordinates': [coordinates[1], coordinates[0]]}
+
+
+def cell_size(precision):
+    # (height, width) in degrees of the cells of a geohash precision
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def bounding_box(lat, lon, radius_km):
+    # (south, west, north, east) around a circle; west > east when it crosses the antimeridian
+    angle = radius_km / EARTH_RADIUS_KM
+    south, north = lat - math.degrees(angle), lat + math.degrees(angle)
+    if south <= -90 or north >= 90 or math.sin(angle) >= math.cos(math.radians(lat)):
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0  # Reaches a pole: every longitude
+    delta = math.degrees(math.asin(math.sin(angle) / math.cos(math.radians(lat))))
+    west, east = lon - delta, lon + delta
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return south, west, north, east
+
+
+def cover_box(south, west, north, east, max_cells=MAX_CELLS):
+    # Geohash prefixes of the finest precision whose cells, at most max_cells of them, cover the box.
+    # Empty when even single-character cells are too many (the query then scans without pruning).
+    # Cells are only counted per precision (row and column ranges), and listed once they are few enough.
+    spans = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+    for precision in range(PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        last_row, last_column = round(180 / height) - 1, round(360 / width) - 1
+        rows = range(int((south + 90) // height), min(int((north + 90) // height), last_row) + 1)
+        column_ranges = [
+            range(int((span_west + 180) // width), min(int((span_east + 180) // width), last_column) + 1)
+            for span_west, span_east in spans
+        ]
+        if len(rows) * sum(len(columns) for columns in column_ranges) <= max_cells:
+            return sorted({
+                geohash(-90 + (row + 0.5) * height, -180 + (column + 0.5) * width, precision)
+                for row in rows for columns in column_ranges for column in columns
+            })
+    return []
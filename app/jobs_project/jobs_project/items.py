@@ -1,42 +1,10 @@
 import scrapy
 
-class JobsProjectItem(scrapy.Item):
-    slug = scrapy.Field()
-    language = scrapy.Field()
-    languages = scrapy.Field()
-    req_id = scrapy.Field()
-    title = scrapy.Field()
-    description = scrapy.Field()
-    street_address = scrapy.Field()
-    city = scrapy.Field()
-    state = scrapy.Field()
-    country_code = scrapy.Field()
-    postal_code = scrapy.Field()
-    location_type = scrapy.Field()
-    latitude = scrapy.Field()
-    longitude = scrapy.Field()
-    categories = scrapy.Field()
-    tags = scrapy.Field()
-    tags5 = scrapy.Field()
-    tags6 = scrapy.Field()
-    brand = scrapy.Field()
-    promotion_value = scrapy.Field()
-    salary_currency = scrapy.Field()
-    salary_value = scrapy.Field()
-    salary_min_value = scrapy.Field()
-    salary_max_value = scrapy.Field()
-    benefits = scrapy.Field()
-    employment_type = scrapy.Field()
-    hiring_organization = scrapy.Field()
-    source = scrapy.Field()
-    apply_url = scrapy.Field()
-    internal = scrapy.Field()
-    searchable = scrapy.Field()
-    applyable = scrapy.Field()
-    li_easy_applyable = scrapy.Field()
-    ats_code = scrapy.Field()
-    update_date = scrapy.Field()
-    create_date = scrapy.Field()
-    category = scrapy.Field()
-    full_location = scrapy.Field()
-    short_location = scrapy.Field()
\ No newline at end of file
+from jobs_project.schema import FIELD_NAMES
+
+# Scrapy item with one Field per job schema field (the spider itself yields the lighter JobRecord)
+JobsProjectItem = type(
+    'JobsProjectItem',
+    (scrapy.Item,),
+    {'__module__': __name__, **{name: scrapy.Field() for name in FIELD_NAMES}}
+)
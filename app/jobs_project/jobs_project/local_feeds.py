@@ -0,0 +1,85 @@
+import glob
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+EMPTY = b''
+
+
+def path_from_source(source, base=None):
+    # Local path of a file:// URL or a plain path (relative paths resolve against `base`)
+    if source.startswith('file://'):
+        return unquote(urlparse(source).path)
+    if base is not None and not os.path.isabs(source):
+        return os.path.join(base, source)
+    return source
+
+
+def resolve_sources(feeds=None, manifest=None, pattern='*.json'):
+    # Feed file paths from a directory (its *.json files), a glob, a single file, and/or a manifest
+    # listing one path, glob or file:// URL per line ('#' starts a comment)
+    sources = []
+    if manifest:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, encoding='utf-8') as file:
+            for line in file:
+                line = line.split('#', 1)[0].strip()
+                if line:
+                    sources.append(path_from_source(line, base))
+    if feeds:
+        sources.extend(path_from_source(source) for source in feeds.split(','))
+
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths.extend(sorted(str(path) for path in Path(source).glob(pattern)))
+        elif glob.has_magic(source):
+            paths.extend(sorted(glob.glob(source, recursive=True)))
+        else:
+            paths.append(source)
+    return list(dict.fromkeys(paths))
+
+
+def open_feed(path):
+    # Map a feed file read-only; the kernel pages it in as the parser walks through it.
+    # The mapping stays valid after the descriptor is closed.
+    with open(path, 'rb') as file:
+        if not os.fstat(file.fileno()).st_size:
+            return EMPTY  # mmap cannot map an empty file
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(buffer, 'madvise'):
+        buffer.madvise(mmap.MADV_SEQUENTIAL)
+        buffer.madvise(mmap.MADV_WILLNEED)  # Start reading ahead before the parser gets to this file
+    return buffer
+
+
+def close_feed(future):
+    if future.done() and future.exception() is None and isinstance(future.result(), mmap.mmap):
+        future.result().close()
+
+
+def iter_open_feeds(paths, concurrency=8):
+    # Yield (path, future) in order while up to `concurrency` files are opened ahead on a thread pool.
+    # future.result() is the mapped file, or raises if it could not be opened; each mapping is
+    # closed once the caller moves on to the next file.
+    paths = iter(paths)
+    concurrency = max(1, concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='feed-open') as pool:
+        pending = deque((path, pool.submit(open_feed, path)) for path in islice(paths, concurrency))
+        try:
+            while pending:
+                path, future = pending[0]
+                for next_path in islice(paths, 1):
+                    pending.append((next_path, pool.submit(open_feed, next_path)))
+                yield path, future
+                pending.popleft()
+                close_feed(future)
+        finally:
+            # The caller stopped early: wait for the files opened ahead and unmap them
+            for _, future in pending:
+                future.exception()
+                close_feed(future)
@@ -0,0 +1,158 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds, from sub-millisecond cache hits to slow batch writes
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_PREFIX = 'jobs_pipeline'
+
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        # Per-bucket (not cumulative) counts; the last slot counts observations above the largest bound
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation (the max for the overflow bucket)
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class PipelineMetrics:
+    def __init__(self):
+        # Stage timings and item counters; stages are timed on worker threads, so updates take a lock
+        self.lock = threading.Lock()
+        self.stages = {}  # stage -> Histogram
+        self.counters = {}  # counter -> int
+        self.last_summary = (time.monotonic(), 0)  # (time, items) of the previous throughput summary
+
+    @contextmanager
+    def time(self, stage):
+        # Record how long the block takes under `stage`, whether or not it raises
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, counter, count=1):
+        if count:
+            with self.lock:
+                self.counters[counter] = self.counters.get(counter, 0) + count
+
+    def publish(self, stats):
+        # Copy the current values into the Scrapy stats collector under jobs/...
+        if stats is None:
+            return
+        with self.lock:
+            for counter, value in self.counters.items():
+                stats.set_value(f"jobs/{counter}", value)
+            for stage, histogram in self.stages.items():
+                stats.set_value(f"jobs/{stage}/count", histogram.count)
+                stats.set_value(f"jobs/{stage}/seconds", round(histogram.sum, 6))
+                stats.set_value(f"jobs/{stage}/p50_ms", round(histogram.quantile(0.5) * 1000, 3))
+                stats.set_value(f"jobs/{stage}/p99_ms", round(histogram.quantile(0.99) * 1000, 3))
+                stats.set_value(f"jobs/{stage}/max_ms", round(histogram.max * 1000, 3))
+
+    def summary(self):
+        # One-line throughput summary since the previous call
+        now = time.monotonic()
+        with self.lock:
+            counters = dict(self.counters)
+            stages = {stage: (histogram.quantile(0.5), histogram.quantile(0.99)) for stage, histogram in self.stages.items()}
+        items = counters.get('items', 0)
+        last_time, last_items = self.last_summary
+        self.last_summary = (now, items)
+        rate = (items - last_items) / (now - last_time) if now > last_time else 0.0
+        latencies = ", ".join(f"{stage} p50 {p50 * 1000:.1f} ms / p99 {p99 * 1000:.1f} ms" for stage, (p50, p99) in sorted(stages.items()))
+        return (
+            f"Processed {items} jobs ({rate:.1f} jobs/s): {counters.get('stored', 0)} stored, "
+            f"{counters.get('skipped', 0)} skipped, {counters.get('failed', 0)} failed"
+            + (f"; {latencies}" if latencies else "")
+        )
+
+    def prometheus_text(self):
+        # Render every counter and stage histogram in the Prometheus text exposition format
+        lines = []
+        with self.lock:
+            for counter, value in sorted(self.counters.items()):
+                name = f"{PROMETHEUS_PREFIX}_{counter}_total"
+                lines += [f"# TYPE {name} counter", f"{name} {value}"]
+            name = f"{PROMETHEUS_PREFIX}_stage_seconds"
+            if self.stages:
+                lines.append(f"# TYPE {name} histogram")
+            for stage, histogram in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    def __init__(self, metrics, host='127.0.0.1', port=9410):
+        # Serve metrics.prometheus_text() at /metrics from a daemon thread
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.server = None
+
+    def start(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes are not worth a log line each
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name='jobs-metrics', daemon=True).start()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -1,21 +1,50 @@
-import json
 import os
 import psycopg2
-from itemadapter import ItemAdapter
-from pathlib import Path
-import sys
+from twisted.internet import defer, task, threads
+from twisted.python.threadpool import ThreadPool
 
-sys.path.append(str(Path(__file__).resolve().parent.parent.parent / 'infra'))
-from postgresql_connector import PostgresConnector
-from redis_connector import RedisConnector
-from mongodb_connector import MongoDBConnector
+from jobs_project.bootstrap import bootstrap_mongo, bootstrap_postgres
+from jobs_project.dedup import PRESENT, ContentStore, RecentIds, fingerprint, write_mongo_contents, write_postgres_contents
+from jobs_project.metrics import MetricsExporter, PipelineMetrics
+from jobs_project.spool import Spool
+from jobs_project.schema import COLUMN_NAMES, KEY_FIELD, build_document, build_row, record_from_item
+from jobs_project.writers import BufferedWriter
+
+from infra.postgresql_connector import PostgresConnector
+from infra.redis_connector import RedisConnector
+from infra.mongodb_connector import MongoDBConnector
+from infra.dedup_store import DedupStore
+from infra.query_cache import QueryCache
+
+# Timing stage recorded for each writer's batch writes
+WRITE_STAGES = {'PostgreSQL': 'postgres_write', 'MongoDB': 'mongo_write'}
 
 class JobsProjectPipeline:
-    def __init__(self, postgres_settings, redis_settings, mongo_settings):
+    # Connector classes, overridable so the stores can be swapped (e.g. for in-process benchmark stand-ins)
+    postgres_connector_class = PostgresConnector
+    redis_connector_class = RedisConnector
+    mongo_connector_class = MongoDBConnector
+
+    def __init__(self, postgres_settings, redis_settings, mongo_settings, postgres_writer_settings, mongo_writer_settings, dedup_settings, metrics_settings=None, spool_dir=None):
         # Initialize the pipeline with settings for PostgreSQL, Redis, and MongoDB
         self.postgres_settings = postgres_settings
         self.redis_settings = redis_settings
         self.mongo_settings = mongo_settings
+        self.postgres_writer_settings = postgres_writer_settings
+        self.mongo_writer_settings = mongo_writer_settings
+        self.dedup_settings = dedup_settings
+        self.recent_ids = RecentIds(dedup_settings['cache_size'])
+        self.unclaimed = {}  # req_id -> record waiting for its Redis claim
+        self.fingerprints = {}  # req_id -> fingerprint of the unclaimed item
+        self.pending = {}  # req_id -> names of the writers that still have to store it
+        self.pending_fingerprints = {}  # req_id -> fingerprint cached once every writer has stored it
+        self.failed_jobs = 0  # Jobs neither stored nor spooled since the last feed checkpoint
+        self.metrics_settings = metrics_settings or {'summary_interval': 60.0, 'port': 0, 'host': '127.0.0.1'}
+        self.metrics = PipelineMetrics()
+        self.spool_dir = spool_dir  # Jobs a store rejects are spooled here for replay; None disables spooling
+        self.stats = None  # Scrapy stats collector, set by from_crawler
+        self.exporter = None
+        self.query_cache_key = 'jobs:query'  # Namespace of query.py's result cache, retired when jobs change
 
     def __del__(self):
         # Close all database connections when the pipeline object is deleted
@@ -24,51 +53,16 @@ class JobsProjectPipeline:
         self.mongodb.close()
 
     def create_table_if_not_exists(self):
-        # Create the 'raw_table' in PostgreSQL if it doesn't already exist.
-        create_table_query = '''
-        CREATE TABLE IF NOT EXISTS raw_table (
-            slug text,
-            language text,
-            languages jsonb,
-            req_id VARCHAR(255) PRIMARY KEY,
-            title text,
-            description text,
-            street_address text,
-            city text,
-            state text,
-            country_code text,
-            postal_code text,
-            location_type text,
-            latitude double precision,
-            longitude double precision,
-            categories jsonb,
-            tags jsonb,
-            tags5 jsonb,
-            tags6 jsonb,
-            brand text,
-            promotion_value bigint,
-            salary_currency text,
-            salary_value bigint,
-            salary_min_value bigint,
-            salary_max_value bigint,
-            benefits jsonb,
-            employment_type text,
-            hiring_organization text,
-            source text,
-            apply_url text,
-            internal boolean,
-            searchable boolean,
-            applyable boolean,
-            li_easy_applyable boolean,
-            ats_code text,
-            update_date text,
-            create_date text,
-            category jsonb,
-            full_location text,
-            short_location text
-        )
-        '''
-        self.postgresql.execute(create_table_query)
+        # Create the 'raw_table' in PostgreSQL if it doesn't already exist, migrate older layouts
+        # (e.g. text dates) and create its indexes.
+        bootstrap_postgres(self.postgresql, 'raw_table', self.spider.logger)
+
+    def create_collection_indexes(self, spider):
+        # Index raw_collection like raw_table, with a unique req_id index for upserts
+        try:
+            bootstrap_mongo(self.mongodb, 'raw_collection', spider.logger)
+        except Exception as e:
+            spider.logger.warning(f"Could not create all indexes on raw_collection: {e}")
 
     @classmethod
     def from_crawler(cls, crawler):
@@ -78,35 +72,105 @@ class JobsProjectPipeline:
             'port': int(os.getenv('POSTGRES_PORT')),  
             'user': os.getenv('POSTGRES_USER'),  
             'password': os.getenv('POSTGRES_PASSWORD'),  
-            'database': os.getenv('POSTGRES_DB')
+            'database': os.getenv('POSTGRES_DB'),
+            'pool_size': crawler.settings.getint('POSTGRES_POOL_SIZE', 4),
         }
         redis_settings = {
             'host': os.getenv('REDIS_HOST'),  
             'port': int(os.getenv('REDIS_PORT')),  
             'db': os.getenv('REDIS_DB'),
+            'max_connections': crawler.settings.getint('REDIS_MAX_CONNECTIONS', 16),
         }
         mongo_settings = {
             'host': os.getenv('MONGO_HOST'),
             'port': int(os.getenv('MONGO_PORT')),
             'database': os.getenv('MONGO_DB'),
             'username': os.getenv('MONGO_USER'),
-            'password': os.getenv('MONGO_PASSWORD')
+            'password': os.getenv('MONGO_PASSWORD'),
+            'max_pool_size': crawler.settings.getint('MONGO_MAX_POOL_SIZE', 50),
+        }
+        postgres_writer_settings = {
+            'batch_size': crawler.settings.getint('POSTGRES_BATCH_SIZE', 500),
+            'flush_interval': crawler.settings.getfloat('POSTGRES_FLUSH_INTERVAL', 5.0),
+        }
+        mongo_writer_settings = {
+            'batch_size': crawler.settings.getint('MONGO_BATCH_SIZE', 1000),
+            'flush_interval': crawler.settings.getfloat('MONGO_FLUSH_INTERVAL', 5.0),
         }
-        return cls(postgres_settings, redis_settings, mongo_settings)
+        dedup_settings = {
+            'mode': crawler.settings.get('DEDUP_MODE', 'presence'),
+            'cache_size': crawler.settings.getint('DEDUP_CACHE_SIZE', 100000),
+            'claim_batch_size': crawler.settings.getint('DEDUP_CLAIM_BATCH_SIZE', 100),
+            'claim_ttl': crawler.settings.getint('DEDUP_CLAIM_TTL', 600),
+            'namespace': crawler.settings.get('DEDUP_NAMESPACE', 'jobs:dedup'),
+            'buckets': crawler.settings.getint('DEDUP_BUCKETS', 65536),
+            'ttl': crawler.settings.getint('DEDUP_TTL', 0),
+        }
+        metrics_settings = {
+            'summary_interval': crawler.settings.getfloat('METRICS_SUMMARY_INTERVAL', 60.0),
+            'port': crawler.settings.getint('METRICS_PORT', 0),
+            'host': crawler.settings.get('METRICS_HOST', '127.0.0.1'),
+        }
+        spool_dir = crawler.settings.get('SPOOL_DIR') or None
+        pipeline = cls(postgres_settings, redis_settings, mongo_settings, postgres_writer_settings, mongo_writer_settings, dedup_settings, metrics_settings, spool_dir)
+        pipeline.stats = crawler.stats
+        pipeline.query_cache_key = crawler.settings.get('QUERY_CACHE_KEY', 'jobs:query')
+        return pipeline
 
     def open_spider(self, spider):
         # Open connections to PostgreSQL, MongoDB, and Redis when the spider starts
+        self.spider = spider
         try:
-            self.postgresql = PostgresConnector(**self.postgres_settings)
+            self.postgresql = self.postgres_connector_class(**self.postgres_settings)
             self.postgresql.connect()
 
             self.create_table_if_not_exists()  # Ensure the PostgreSQL table exists
 
-            self.mongodb = MongoDBConnector(**self.mongo_settings)
+            self.mongodb = self.mongo_connector_class(**self.mongo_settings)
             self.mongodb.connect()
+            self.create_collection_indexes(spider)
 
-            self.redis = RedisConnector(**self.redis_settings)
+            self.redis = self.redis_connector_class(**self.redis_settings)
             self.redis.connect()
+            self.query_cache = QueryCache(self.redis, self.query_cache_key)
+            self.dedup_store = DedupStore(
+                self.redis, self.dedup_settings['namespace'], self.dedup_settings['buckets'], self.dedup_settings['ttl']
+            )
+
+            # Descriptions and other content-addressed fields are written once per distinct value and store
+            self.contents = {
+                'PostgreSQL': ContentStore(self.write_postgres_contents, self.dedup_settings['cache_size']),
+                'MongoDB': ContentStore(self.write_mongo_contents, self.dedup_settings['cache_size']),
+            }
+
+            # Each store gets its own buffer and flush thresholds
+            self.writers = [
+                BufferedWriter(
+                    'PostgreSQL',
+                    write_batch=self.write_postgres_batch,
+                    write_one=self.write_postgres_row,
+                    logger=spider.logger,
+                    **self.postgres_writer_settings
+                ),
+                BufferedWriter(
+                    'MongoDB',
+                    write_batch=self.write_mongo_batch,
+                    write_one=self.write_mongo_document,
+                    logger=spider.logger,
+                    **self.mongo_writer_settings
+                ),
+            ]
+            self.spools = {
+                writer.name: Spool(self.spool_dir, writer.name.lower()) for writer in self.writers
+            } if self.spool_dir else {}
+            # Redis claims and each store's writes run one batch at a time, in order, off the reactor thread
+            self.claim_lock = defer.DeferredLock()
+            self.claiming = 0  # Claim batches whose jobs are neither unclaimed nor pending yet
+            self.write_locks = {writer.name: defer.DeferredLock() for writer in self.writers}
+            self.running = set()
+            self.flush_loop = task.LoopingCall(self.flush_due_writers)
+            self.flush_loop.start(min(writer.flush_interval for writer in self.writers), now=False)
+            self.open_metrics(spider)
 
         except psycopg2.OperationalError as e:
             spider.logger.error(f"PostgreSQL connection error: {e}")
@@ -115,8 +179,42 @@ class JobsProjectPipeline:
             spider.logger.error(f"Error connecting to services: {e}")
             raise Exception("Failed to initialize connections.") from e
 
+    def open_metrics(self, spider):
+        # Log throughput summaries periodically and, if METRICS_PORT is set, serve Prometheus metrics
+        self.summary_loop = task.LoopingCall(self.log_summary)
+        self.summary_loop.start(self.metrics_settings['summary_interval'], now=False)
+        if self.metrics_settings['port']:
+            self.exporter = MetricsExporter(self.metrics, self.metrics_settings['host'], self.metrics_settings['port'])
+            self.exporter.start()
+            spider.logger.info(f"Serving pipeline metrics on http://{self.exporter.host}:{self.exporter.port}/metrics")
+
+    def log_summary(self):
+        self.metrics.publish(self.stats)
+        self.spider.logger.info(self.metrics.summary())
+
+    def close_metrics(self):
+        # Final summary and stats once every batch has been written
+        if self.summary_loop.running:
+            self.summary_loop.stop()
+        self.log_summary()
+        if self.exporter is not None:
+            self.exporter.stop()
+
+    @defer.inlineCallbacks
     def close_spider(self, spider):
-        # Close all database connections when the spider finishes.
+        # Flush any partial batch, wait for the writes, then close all database connections when the spider finishes.
+        if self.flush_loop.running:
+            self.flush_loop.stop()
+        yield self.claim_unclaimed()
+        yield self.drain()
+        for writer in self.writers:
+            yield self.flush_writer(writer)
+        yield self.drain()
+        self.finish_feeds()
+        self.close_metrics()
+        self.close_connections(spider)
+
+    def close_connections(self, spider):
         try:
             self.postgresql.close()
             self.mongodb.close()
@@ -126,138 +224,318 @@ class JobsProjectPipeline:
             raise
 
     def process_item(self, item, spider):
-        # Process each scraped item, storing it in PostgreSQL, MongoDB, and Redis.
-        adapter = ItemAdapter(item)
+        # Claim each new job in Redis, then buffer it for PostgreSQL and MongoDB. Redis round trips and store
+        # writes (and their retry backoff) run on worker threads; while a due batch is claimed and written,
+        # a Deferred holds Scrapy back.
+        if self.buffer_item(item, spider):
+            return self.claim_unclaimed().addCallback(lambda _: item)
+        return item
 
-        red_id = adapter.get('req_id')
+    def buffer_item(self, item, spider):
+        # Queue a job for its Redis claim; True once a claim batch is due
+        record = record_from_item(item)
+        self.metrics.inc('items')
 
-        # Check if the job is already processed (cached in Redis)
-        if self.redis.exists(red_id):
-            spider.logger.info(f"Duplicate job {red_id} found in cache. Skipping.")
-            return item
+        red_id = record.req_id
+        job_fingerprint = fingerprint(record, self.dedup_settings['mode'])
 
-        # Insert job data into PostgreSQL
-        try:
-            query = '''
-                INSERT INTO "raw_table" (
-                    "slug", "language", "languages", "req_id", "title", "description", 
-                    "street_address", "city", "state", "country_code", "postal_code", 
-                    "location_type", "latitude", "longitude", "categories", "tags", "tags5", 
-                    "tags6", "brand", "promotion_value", "salary_currency", "salary_value", 
-                    "salary_min_value", "salary_max_value", "benefits", "employment_type", 
-                    "hiring_organization", "source", "apply_url", "internal", "searchable", 
-                    "applyable", "li_easy_applyable", "ats_code", "update_date", "create_date", 
-                    "category", "full_location", "short_location"
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s
-                )
-            '''
-            data = (
-                item.get('slug'),
-                item.get('language'),
-                json.dumps(item.get('languages', [])),  
-                item.get('req_id'),
-                item.get('title'),
-                item.get('description'),
-                item.get('street_address'),
-                item.get('city'),
-                item.get('state'),
-                item.get('country_code'),
-                item.get('postal_code'),
-                item.get('location_type'),
-                item.get('latitude'),
-                item.get('longitude'),
-                json.dumps(item.get('categories', [])),
-                json.dumps(item.get('tags', [])),
-                json.dumps(item.get('tags5', [])),
-                json.dumps(item.get('tags6', [])),
-                item.get('brand'),
-                item.get('promotion_value'),
-                item.get('salary_currency'),
-                item.get('salary_value'),
-                item.get('salary_min_value'),
-                item.get('salary_max_value'),
-                json.dumps(item.get('benefits', [])),
-                item.get('employment_type'),
-                item.get('hiring_organization'),
-                item.get('source'),
-                item.get('apply_url'),
-                item.get('internal'),
-                item.get('searchable'),
-                item.get('applyable'),
-                item.get('li_easy_applyable'),
-                item.get('ats_code'),
-                item.get('update_date'),
-                item.get('create_date'),
-                json.dumps(item.get('category', [])),
-                item.get('full_location'),
-                item.get('short_location')
-            )
+        # Repeats within this crawl are caught in-process without a Redis round trip
+        if self.recent_ids.seen(red_id, job_fingerprint):
+            spider.logger.debug(f"Duplicate job {red_id} already seen in this crawl. Skipping.")
+            self.metrics.inc('skipped')
+            return False
+
+        self.unclaimed[red_id] = record
+        self.fingerprints[red_id] = job_fingerprint
+        return len(self.unclaimed) >= self.dedup_settings['claim_batch_size']
+
+    def claim_unclaimed(self):
+        # Claim buffered jobs in one Redis round trip on a worker thread, after the earlier claim batches;
+        # unchanged jobs and jobs another crawl holds are skipped. Fires once the claimed jobs are written
+        batch, self.unclaimed = self.unclaimed, {}
+        if not batch:
+            return defer.succeed(None)
+        fingerprints = self.take_fingerprints(batch)
+        self.claiming += 1
+        d = self.claim_lock.run(threads.deferToThread, self.claim_batch, fingerprints)
+        d.addBoth(self.claim_returned)
+        d.addCallback(lambda claimed: self.accept_claimed(batch, fingerprints, claimed))
+        return self.track(d)
 
-            self.postgresql.execute(query, data)
-            spider.logger.info(f"Successfully inserted job {red_id} into PostgreSQL.")
+    def claim_returned(self, result):
+        self.claiming -= 1
+        return result
+
+    def take_fingerprints(self, batch):
+        return {red_id: self.fingerprints.pop(red_id) for red_id in batch}
+
+    def claim_batch(self, fingerprints):
+        # Blocking Redis round trip; returns the claimed req_ids, or None if Redis failed.
+        # A job is claimed when its cached fingerprint differs (presence mode caches PRESENT for every job).
+        try:
+            with self.metrics.time('dedup'):
+                return self.dedup_store.claim(fingerprints, self.dedup_settings['claim_ttl'])
         except Exception as e:
-            spider.logger.error(f"Error inserting job {red_id} into PostgreSQL. Query: {query}, Data: {data}. Error: {e}")
+            self.spider.logger.error(f"Error claiming {len(fingerprints)} jobs in Redis: {e}")
             return None
-        
-        # Insert job data into MongoDB
-        try:
-            document = {
-                'slug': adapter.get('slug'),
-                'language': adapter.get('language'),
-                'languages': adapter.get('languages', []),
-                'req_id': adapter.get('req_id'),
-                'title': adapter.get('title'),
-                'description': adapter.get('description'),
-                'street_address': adapter.get('street_address'),
-                'city': adapter.get('city'),
-                'state': adapter.get('state'),
-                'country_code': adapter.get('country_code'),
-                'postal_code': adapter.get('postal_code'),
-                'location_type': adapter.get('location_type'),
-                'latitude': adapter.get('latitude'),
-                'longitude': adapter.get('longitude'),
-                'categories': adapter.get('categories', []),
-                'tags': adapter.get('tags', []),
-                'tags5': adapter.get('tags5', []),
-                'tags6': adapter.get('tags6', []),
-                'brand': adapter.get('brand'),
-                'promotion_value': adapter.get('promotion_value'),
-                'salary_currency': adapter.get('salary_currency'),
-                'salary_value': adapter.get('salary_value'),
-                'salary_min_value': adapter.get('salary_min_value'),
-                'salary_max_value': adapter.get('salary_max_value'),
-                'benefits': adapter.get('benefits', []),
-                'employment_type': adapter.get('employment_type'),
-                'hiring_organization': adapter.get('hiring_organization'),
-                'source': adapter.get('source'),
-                'apply_url': adapter.get('apply_url'),
-                'internal': adapter.get('internal'),
-                'searchable': adapter.get('searchable'),
-                'applyable': adapter.get('applyable'),
-                'li_easy_applyable': adapter.get('li_easy_applyable'),
-                'ats_code': adapter.get('ats_code'),
-                'update_date': adapter.get('update_date'),
-                'create_date': adapter.get('create_date'),
-                'category': adapter.get('category', []),
-                'full_location': adapter.get('full_location'),
-                'short_location': adapter.get('short_location')
-            }
 
-            # Insert the document into MongoDB
-            self.mongodb.insert_one('raw_collection', document)
-            spider.logger.info(f"Successfully inserted job {red_id} into MongoDB.")
+    def accept_claimed(self, batch, fingerprints, claimed):
+        # Hand claimed jobs to every writer and flush the writers whose batches are due
+        if claimed is None:
+            for red_id in batch:
+                self.recent_ids.discard(red_id)
+            self.metrics.inc('failed', len(batch))
+            self.failed_jobs += len(batch)
+            return
+
+        skipped = len(batch) - len(claimed)
+        if skipped:
+            self.spider.logger.debug(f"Skipped {skipped} jobs already cached in Redis and unchanged.")
+        self.metrics.inc('skipped', skipped)
+        self.metrics.inc('claimed', len(claimed))
+
+        due = []
+        for red_id in claimed:
+            self.pending[red_id] = {writer.name for writer in self.writers}
+            self.pending_fingerprints[red_id] = fingerprints[red_id]
+            for writer in self.writers:
+                if writer.add(red_id, batch[red_id]) and writer not in due:
+                    due.append(writer)
+        return self.flush_writers(due)
+
+    def flush_writers(self, writers):
+        return defer.DeferredList([self.flush_writer(writer) for writer in writers])
+
+    def flush_writer(self, writer):
+        # Write the writer's buffered batch on a worker thread, after the store's earlier batches, then
+        # settle its jobs on the reactor thread and update their Redis claims on a worker thread.
+        # Fires once that is done.
+        batch = writer.take()
+        if not batch:
+            return defer.succeed(None)
+        d = self.write_locks[writer.name].run(threads.deferToThread, self.write_batch, writer, batch)
+        d.addCallback(lambda result: threads.deferToThread(self.update_claims, *self.settle(writer, *result)))
+        d.addCallback(lambda _: self.finish_feeds())
+        return self.track(d)
+
+    def track(self, d):
+        # Remember a running claim or write so close_spider can wait for it
+        self.running.add(d)
+        d.addErrback(lambda failure: self.spider.logger.error(f"Error in pipeline write: {failure.getErrorMessage()}"))
+        d.addBoth(lambda _: self.running.discard(d))
+        return d
+
+    @defer.inlineCallbacks
+    def drain(self):
+        # Wait until all running claims and writes (including the ones they start) have finished
+        while self.running:
+            yield defer.DeferredList(list(self.running))
+
+    def write_batch(self, writer, batch):
+        # Blocking store write of a taken batch, timed per store; jobs the store rejects are spooled.
+        # Returns (written, failed, spooled) req_ids.
+        with self.metrics.time(WRITE_STAGES.get(writer.name, writer.name)):
+            written, failed = writer.write(batch)
+        spooled = []
+        if failed and writer.name in self.spools:
+            _, failed, spooled = self.spool_batch(writer, {red_id: batch[red_id] for red_id in failed})
+        return written, failed, spooled
+
+    def spool_batch(self, writer, batch):
+        # Append jobs to the writer's spool instead of its store. A spooled job is replayed later, so it does
+        # not hold back its Redis claim, but it is counted as spooled rather than written.
+        # Returns ([], failed, spooled), like write_batch.
+        try:
+            self.spools[writer.name].append(list(batch.values()))
         except Exception as e:
-            spider.logger.error(f"Error inserting job {red_id} into MongoDB: {e}")
-            return None
+            self.spider.logger.error(f"Error spooling {len(batch)} jobs for {writer.name}: {e}")
+            return [], list(batch), []
+        self.metrics.inc(f"{WRITE_STAGES.get(writer.name, writer.name)}_spooled", len(batch))
+        self.spider.logger.warning(f"Spooled {len(batch)} jobs for {writer.name} to {self.spools[writer.name].path}")
+        return [], [], list(batch)
+
+    def flush_due_writers(self):
+        # Called periodically so a slow trickle of items still gets written out
+        self.claim_unclaimed()
+        for writer in self.writers:
+            if writer.is_due():
+                self.flush_writer(writer)
+        self.finish_feeds()
+
+    def is_settled(self):
+        # True when every job handed to the pipeline so far has been stored, skipped or failed
+        return (not self.unclaimed and not self.claiming and not self.pending
+                and not any(writer.buffer for writer in self.writers))
+
+    def finish_feeds(self):
+        # Checkpoint for distributed crawls: once the pipeline is settled, the queued feeds the spider has
+        # fully parsed are finished. Until then they stay in the worker's processing list, so a crash
+        # requeues them instead of losing jobs that were only buffered.
+        if not getattr(self.spider, 'parsed_feeds', None) or not self.is_settled():
+            return
+        failed, self.failed_jobs = self.failed_jobs, 0
+        self.spider.finish_feeds(failed=bool(failed))
+
+    def write_postgres_contents(self, contents):
+        write_postgres_contents(self.postgresql, 'raw_table', contents)
+        self.metrics.inc('postgres_contents_written', sum(len(values) for values in contents.values()))
+
+    def write_mongo_contents(self, contents):
+        write_mongo_contents(self.mongodb, 'raw_collection', contents)
+        self.metrics.inc('mongo_contents_written', sum(len(values) for values in contents.values()))
+
+    def write_postgres_batch(self, records):
+        # Upsert a whole batch into PostgreSQL in a single transaction, after any descriptions it is first to use
+        self.contents['PostgreSQL'].store(records)
+        rows = [build_row(record) for record in records]
+        self.postgresql.upsert_many('raw_table', COLUMN_NAMES, rows, KEY_FIELD, page_size=len(rows))
 
+    def write_postgres_row(self, record):
+        # Per-row fallback used when a batch fails
+        self.contents['PostgreSQL'].store([record])
+        self.postgresql.upsert('raw_table', COLUMN_NAMES, build_row(record), KEY_FIELD)
+
+    def write_mongo_batch(self, records):
+        # Upsert a whole batch into MongoDB with unordered bulk writes, after any descriptions it is first to use
+        self.contents['MongoDB'].store(records)
+        documents = [build_document(record) for record in records]
+        self.mongodb.bulk_upsert('raw_collection', documents, key=KEY_FIELD, batch_size=len(documents))
+
+    def write_mongo_document(self, record):
+        # Per-document fallback used when a batch fails
+        self.contents['MongoDB'].store([record])
+        self.mongodb.upsert_one('raw_collection', build_document(record), key=KEY_FIELD)
+
+    def settle(self, writer, written, failed, spooled=()):
+        # Work out which jobs every writer has now stored or spooled (completed) and which failed (released)
+        self.spider.logger.debug(
+            f"Upserted {len(written)} jobs into {writer.name} ({len(failed)} failed, {len(spooled)} spooled)."
+        )
+        stage = WRITE_STAGES.get(writer.name, writer.name)
+        self.metrics.inc(f"{stage}_written", len(written))
+        self.metrics.inc(f"{stage}_failed", len(failed))
+
+        released = [red_id for red_id in failed if self.pending.pop(red_id, None) is not None]
+        for red_id in released:
+            self.recent_ids.discard(red_id)
+            self.pending_fingerprints.pop(red_id, None)
+
+        completed = {}
+        for red_id in [*written, *spooled]:
+            waiting = self.pending.get(red_id)
+            if waiting is None:
+                continue
+            waiting.discard(writer.name)
+            if not waiting:
+                del self.pending[red_id]
+                completed[red_id] = self.pending_fingerprints.pop(red_id, PRESENT)
+        self.metrics.inc('stored', len(completed))
+        self.metrics.inc('failed', len(released))
+        self.failed_jobs += len(released)
+        return completed, released
+
+    def update_claims(self, completed, released):
+        # Replace completed claims with the job's fingerprint (kept for DEDUP_TTL); released claims are
+        # dropped so the next crawl retries them
         try:
-            # Cache the job in Redis
-            self.redis.set(red_id, 1)
-            spider.logger.info(f"Job {red_id} cached in Redis.")
+            with self.metrics.time('cache_set'):
+                self.dedup_store.release(released)
+                if completed:
+                    self.dedup_store.confirm(completed)
+                    self.query_cache.bump()  # Cached lookups may miss these jobs now
         except Exception as e:
-            spider.logger.error(f"Error caching job {red_id} in Redis: {e}")
+            self.spider.logger.error(f"Error updating {len(completed) + len(released)} job claims in Redis: {e}")
+
+
+class AsyncJobsProjectPipeline(JobsProjectPipeline):
+    # Variant of JobsProjectPipeline that keeps all blocking I/O off the reactor thread: Redis claims and
+    # claim updates as well as batch writes run on a bounded thread pool, behind bounded per-store queues;
+    # bookkeeping stays on the reactor thread.
+    # Enable with ITEM_PIPELINES = {'jobs_project.pipelines.AsyncJobsProjectPipeline': 300}.
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = super().from_crawler(crawler)
+        pipeline.thread_count = crawler.settings.getint('PIPELINE_THREADS', 4)
+        pipeline.max_in_flight = crawler.settings.getint('PIPELINE_MAX_IN_FLIGHT', 8)
+        pipeline.sink_queue_size = crawler.settings.getint('SINK_QUEUE_BATCHES', 4)
+        pipeline.sink_queue_timeout = crawler.settings.getfloat('SINK_QUEUE_TIMEOUT', 30.0)
+        return pipeline
+
+    def open_spider(self, spider):
+        super().open_spider(spider)
+        self.thread_pool = ThreadPool(minthreads=1, maxthreads=self.thread_count, name='jobs-pipeline')
+        self.thread_pool.start()
+        self.in_flight = defer.DeferredSemaphore(self.max_in_flight)  # Claim batches not yet handed to the writers
+        # Each store has its own bounded queue of batches and writes one batch at a time, in order,
+        # so a slow store never holds back the others
+        self.sink_queues = {writer.name: defer.DeferredSemaphore(self.sink_queue_size) for writer in self.writers}
+
+    def is_settled(self):
+        # Claims in flight hold jobs that are neither unclaimed nor pending yet
+        return self.in_flight.tokens == self.max_in_flight and super().is_settled()
+
+    @defer.inlineCallbacks
+    def close_spider(self, spider):
+        yield super().close_spider(spider)
+        self.thread_pool.stop()
+
+    def in_thread(self, func, *args):
+        from twisted.internet import reactor
+        return threads.deferToThreadPool(reactor, self.thread_pool, func, *args)
+
+    def claim_unclaimed(self):
+        # Fires once the claim batch has an in-flight slot; the claim itself runs on the thread pool
+        return self.in_flight.acquire().addCallback(self.start_claim)
+
+    def start_claim(self, _):
+        batch, self.unclaimed = self.unclaimed, {}
+        if not batch:
+            self.in_flight.release()
+            return
+        fingerprints = self.take_fingerprints(batch)
+        d = self.in_thread(self.claim_batch, fingerprints)
+        d.addCallback(lambda claimed: self.accept_claimed(batch, fingerprints, claimed))
+        d.addBoth(self.release_slot)
+        self.track(d)
+
+    def flush_writer(self, writer):
+        # Fires once the batch is in its store's queue; the write itself runs on the thread pool.
+        # A full queue holds the claim slot (and so the crawl) back; if spooling is on and no slot frees
+        # up within SINK_QUEUE_TIMEOUT seconds, the store is stuck rather than slow and the batch is spooled.
+        queue = self.sink_queues[writer.name]
+        if writer.name not in self.spools:
+            return queue.acquire().addCallback(self.start_flush, writer)
+        from twisted.internet import reactor
+        d = queue.acquire().addTimeout(self.sink_queue_timeout, reactor)
+        return d.addCallbacks(self.start_flush, self.spool_behind, callbackArgs=(writer,), errbackArgs=(writer,))
+
+    def spool_behind(self, failure, writer):
+        failure.trap(defer.TimeoutError)
+        batch = writer.take()
+        if batch:
+            self.spider.logger.warning(
+                f"{writer.name} has been {self.sink_queue_size} batches behind for {self.sink_queue_timeout}s, spooling"
+            )
+            self.start_write(writer, self.in_thread(self.spool_batch, writer, batch))
+
+    def start_flush(self, _, writer):
+        queue = self.sink_queues[writer.name]
+        batch = writer.take()
+        if not batch:
+            queue.release()
+            return
+        d = self.write_locks[writer.name].run(self.in_thread, self.write_batch, writer, batch)
+        d.addBoth(lambda result: (queue.release(), result)[1])
+        self.start_write(writer, d)
+
+    def start_write(self, writer, d):
+        # Settle the claims of a batch once its write (or spooling) returns (written, failed, spooled)
+        d.addCallback(lambda result: self.settle(writer, *result))
+        d.addCallback(lambda claims: self.in_thread(self.update_claims, *claims))
+        d.addCallback(lambda _: self.finish_feeds())
+        self.track(d)
 
-        return item
\ No newline at end of file
+    def release_slot(self, result):
+        self.in_flight.release()
+        return result
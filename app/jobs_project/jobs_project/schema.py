@@ -0,0 +1,491 @@
+import hashlib
+from dataclasses import field, make_dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+from itemadapter import ItemAdapter
+
+from infra.codec import codec
+from jobs_project.geo import geohash, point
+
+
+class JobField:
+    __slots__ = ('name', 'type', 'sql_type', 'json', 'categorical', 'index', 'hash_of', 'search', 'geo', 'rollup')
+
+    def __init__(self, name, type, sql_type, json=False, categorical=False, index=None, hash_of=None, search=None,
+                 geo=False, rollup=None):
+        # A job field: Python type, PostgreSQL column type, whether it is stored as a JSON document,
+        # whether it has few distinct values (dictionary-encoded in columnar exports),
+        # the index kept on it ('btree', or 'gin' for jsonb) since it is a common filter,
+        # for a content hash, the field it addresses (computed at ingest, not read from the feed),
+        # its weight in the full-text search vector ('A' ranks highest, None leaves it out),
+        # whether it is the geohash cell of the job's latitude/longitude (also computed at ingest),
+        # and how the rollups aggregate it ('count' jobs per value, 'sketch' its distribution per currency)
+        self.name = name
+        self.type = type
+        self.sql_type = sql_type
+        self.json = json
+        self.categorical = categorical
+        self.index = index
+        self.hash_of = hash_of
+        self.search = search
+        self.geo = geo
+        self.rollup = rollup
+
+    @property
+    def derived(self):
+        return bool(self.hash_of or self.geo)
+
+
+# Every job field exactly once, in raw_table column order
+JOB_FIELDS = (
+    JobField('slug', str, 'text'),
+    JobField('language', str, 'text', categorical=True),
+    JobField('languages', list, 'jsonb', json=True),
+    JobField('req_id', str, 'VARCHAR(255) PRIMARY KEY'),
+    JobField('title', str, 'text', search='A'),
+    JobField('description', str, 'text', search='B'),
+    JobField('description_hash', str, 'text', hash_of='description'),
+    JobField('street_address', str, 'text'),
+    JobField('city', str, 'text', categorical=True, index='btree'),
+    JobField('state', str, 'text', categorical=True, index='btree', rollup='count'),
+    JobField('country_code', str, 'text', categorical=True, index='btree', rollup='count'),
+    JobField('postal_code', str, 'text'),
+    JobField('location_type', str, 'text', categorical=True),
+    JobField('latitude', float, 'double precision'),
+    JobField('longitude', float, 'double precision'),
+    JobField('geohash', str, 'text COLLATE "C"', index='btree', geo=True),
+    JobField('categories', list, 'jsonb', json=True, index='gin'),
+    JobField('tags', list, 'jsonb', json=True, index='gin'),
+    JobField('tags5', list, 'jsonb', json=True),
+    JobField('tags6', list, 'jsonb', json=True),
+    JobField('brand', str, 'text', categorical=True),
+    JobField('promotion_value', int, 'bigint'),
+    JobField('salary_currency', str, 'text', categorical=True),
+    JobField('salary_value', int, 'bigint', rollup='sketch'),
+    JobField('salary_min_value', int, 'bigint', rollup='sketch'),
+    JobField('salary_max_value', int, 'bigint', rollup='sketch'),
+    JobField('benefits', list, 'jsonb', json=True),
+    JobField('employment_type', str, 'text', categorical=True, index='btree', rollup='count'),
+    JobField('hiring_organization', str, 'text', categorical=True),
+    JobField('source', str, 'text', categorical=True),
+    JobField('apply_url', str, 'text'),
+    JobField('internal', bool, 'boolean'),
+    JobField('searchable', bool, 'boolean'),
+    JobField('applyable', bool, 'boolean'),
+    JobField('li_easy_applyable', bool, 'boolean'),
+    JobField('ats_code', str, 'text', categorical=True),
+    JobField('update_date', datetime, 'timestamptz', index='btree'),
+    JobField('create_date', datetime, 'timestamptz', index='btree'),
+    JobField('category', list, 'jsonb', json=True, rollup='count'),
+    JobField('full_location', str, 'text'),
+    JobField('short_location', str, 'text'),
+)
+
+FIELD_NAMES = tuple(job_field.name for job_field in JOB_FIELDS)
+FIELDS_BY_NAME = {job_field.name: job_field for job_field in JOB_FIELDS}
+KEY_FIELD = 'req_id'
+
+# Fields stored once per distinct value, in a side table/collection keyed by content hash, while job rows
+# and documents carry only the hash: {content field: hash field}. Templated feeds repeat descriptions a lot.
+CONTENT_FIELDS = {job_field.hash_of: job_field.name for job_field in JOB_FIELDS if job_field.hash_of}
+# Fields written with every job, in raw_table column order
+STORED_FIELDS = tuple(job_field for job_field in JOB_FIELDS if job_field.name not in CONTENT_FIELDS)
+COLUMN_NAMES = tuple(job_field.name for job_field in STORED_FIELDS)
+# Fields as the feed has them (nothing derived), which is also what exports contain
+FEED_FIELD_NAMES = tuple(job_field.name for job_field in JOB_FIELDS if not job_field.derived)
+
+# Spatial lookups: raw_table prunes by geohash prefix ranges (the C collation keeps the B-tree in byte order),
+# raw_collection documents also carry a GeoJSON point under a 2dsphere index
+GEOHASH_FIELD = next(job_field.name for job_field in JOB_FIELDS if job_field.geo)
+LOCATION_FIELD = 'location'
+
+# Full-text search: raw_table.search_vector (GIN-indexed) holds the weighted terms of every `search` field.
+# A trigger keeps it current on insert and update; content-addressed fields contribute the vector their
+# side table computes once per distinct value, so a shared description is only tokenized once.
+SEARCH_COLUMN = 'search_vector'
+SEARCH_CONFIG = 'english'
+
+# Rollups: <table>_counts holds the number of jobs per value of every `rollup='count'` field (per element
+# for arrays), <table>_sketches a log-bucketed histogram per currency of every `rollup='sketch'` field.
+# Buckets grow by SKETCH_GAMMA, so a value read back from its bucket is within SKETCH_ACCURACY of the
+# original, and sketches merge (and shrink) by adding bucket counts. Triggers apply every insert, update
+# and delete to both as deltas, so aggregate reads never scan the job table.
+COUNT_FIELDS = tuple(job_field.name for job_field in JOB_FIELDS if job_field.rollup == 'count')
+SKETCH_FIELDS = tuple(job_field.name for job_field in JOB_FIELDS if job_field.rollup == 'sketch')
+SKETCH_GROUP = 'salary_currency'  # Jobs without a currency are summarized under ''
+SKETCH_ACCURACY = 0.01
+SKETCH_GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+
+# Lightweight record the spider yields: a slotted dataclass, which Scrapy and ItemAdapter handle natively
+JobRecord = make_dataclass(
+    'JobRecord',
+    [(job_field.name, Optional[job_field.type], field(default=None)) for job_field in JOB_FIELDS],
+    slots=True
+)
+JobRecord.__module__ = __name__
+
+
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S%z'
+
+
+def content_hash(value):
+    # Address of a content-addressed value: hex SHA-256 of its UTF-8 bytes (CONTENT_HASH_SQL in PostgreSQL)
+    if value is None:
+        return None
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+CONTENT_HASH_SQL = "encode(sha256(convert_to({column}, 'UTF8')), 'hex')"
+
+
+def parse_timestamp(value):
+    # Feed timestamps ('2024-02-02T07:07:39+0000') as aware datetimes; naive values are taken as UTC
+    if value is None or isinstance(value, datetime):
+        parsed = value
+    elif not value:
+        return None
+    else:
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            # Before Python 3.11 fromisoformat rejects offsets without a colon, as the feeds use
+            try:
+                parsed = datetime.strptime(value, TIMESTAMP_FORMAT)
+            except ValueError:
+                return None  # Not a timestamp; the column stays empty rather than failing the job
+    if parsed is not None and parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _convert(job_field, expression):
+    # Source expression converting a raw feed value to the field's type
+    if job_field.hash_of:
+        return f"content_hash({expression})"
+    if job_field.geo:
+        return "geohash(get('latitude'), get('longitude'))"
+    if job_field.type is datetime:
+        return f"parse_timestamp({expression})"
+    return expression
+
+
+def _compile(name, source):
+    # Build a function from generated source once, at import time
+    namespace = {
+        'JobRecord': JobRecord, 'dumps': codec.dumps_cached, 'parse_timestamp': parse_timestamp,
+        'content_hash': content_hash, 'geohash': geohash, 'point': point,
+    }
+    exec(source, namespace)
+    return namespace[name]
+
+
+# record_from_feed(data): JobRecord from a feed's `data` object in one pass of positional lookups
+record_from_feed = _compile('record_from_feed', (
+    "def record_from_feed(data):\n"
+    "    get = data.get\n"
+    "    return JobRecord(" + ", ".join(
+        _convert(job_field, f"get({job_field.hash_of or job_field.name!r})") for job_field in JOB_FIELDS
+    ) + ")\n"
+))
+
+# build_row(record): raw_table values in COLUMN_NAMES order, JSON fields encoded for jsonb
+build_row = _compile('build_row', (
+    "def build_row(record):\n"
+    "    return (" + ", ".join(
+        f"dumps(record.{job_field.name})" if job_field.json else f"record.{job_field.name}"
+        for job_field in STORED_FIELDS
+    ) + ",)\n"
+))
+
+# build_document(record): the raw_collection document
+build_document = _compile('build_document', (
+    "def build_document(record):\n"
+    "    return {" + ", ".join(f"{name!r}: record.{name}" for name in COLUMN_NAMES) +
+    f", {LOCATION_FIELD!r}: point(record.latitude, record.longitude)}}\n"
+))
+
+# build_feed_document(record): the job as the feed has it, contents inline (what the spool keeps)
+build_feed_document = _compile('build_feed_document', (
+    "def build_feed_document(record):\n"
+    "    return {" + ", ".join(f"{name!r}: record.{name}" for name in FEED_FIELD_NAMES) + "}\n"
+))
+
+
+def record_from_item(item):
+    # Convert any other item type (scrapy.Item, dict, ...) into a JobRecord
+    if isinstance(item, JobRecord):
+        return item
+    adapter = ItemAdapter(item)
+    return record_from_feed({name: adapter.get(name) for name in FEED_FIELD_NAMES})
+
+
+def create_table_sql(table):
+    # CREATE TABLE statement for the job table
+    columns = ",\n".join(f"    {job_field.name} {job_field.sql_type}" for job_field in STORED_FIELDS)
+    return f"CREATE TABLE IF NOT EXISTS {table} (\n{columns},\n    {SEARCH_COLUMN} tsvector\n)"
+
+
+def weighted_vector_sql(expression, weight):
+    return f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({expression}, '')), '{weight}')"
+
+
+def content_table(table, name):
+    # Side table (or collection) holding the distinct values of a content-addressed field:
+    # raw_table_descriptions (hash, description), raw_collection_descriptions {_id: hash, description}
+    return f"{table}_{name}s"
+
+
+def create_content_tables_sql(table):
+    # Side tables; searchable contents also get a generated search vector, computed once per distinct value
+    statements = []
+    for name in CONTENT_FIELDS:
+        side = content_table(table, name)
+        statements.append(
+            f"CREATE TABLE IF NOT EXISTS {side} (\n"
+            f"    hash text PRIMARY KEY,\n    {name} {FIELDS_BY_NAME[name].sql_type}\n)"
+        )
+        if FIELDS_BY_NAME[name].search:
+            statements.append(
+                f"ALTER TABLE {side} ADD COLUMN IF NOT EXISTS {SEARCH_COLUMN} tsvector "
+                f"GENERATED ALWAYS AS ({weighted_vector_sql(name, FIELDS_BY_NAME[name].search)}) STORED"
+            )
+    return statements
+
+
+def search_vector_sql(table, row):
+    # Expression for a job's search vector; `row` is how its columns are referenced ('NEW' in a trigger)
+    parts = []
+    for job_field in JOB_FIELDS:
+        if not job_field.search:
+            continue
+        if job_field.name in CONTENT_FIELDS:
+            side = content_table(table, job_field.name)
+            parts.append(
+                f"coalesce((SELECT {SEARCH_COLUMN} FROM {side} "
+                f"WHERE hash = {row}.{CONTENT_FIELDS[job_field.name]}), ''::tsvector)"
+            )
+        else:
+            parts.append(weighted_vector_sql(f"{row}.{job_field.name}", job_field.search))
+    return " || ".join(parts)
+
+
+def search_trigger_sql(table):
+    # Statements (re)creating the trigger that fills search_vector whenever a job is inserted or updated
+    function = f"{table}_{SEARCH_COLUMN}"
+    sources = [CONTENT_FIELDS.get(job_field.name, job_field.name) for job_field in JOB_FIELDS if job_field.search]
+    return [
+        f"CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$\n"
+        f"BEGIN\n    NEW.{SEARCH_COLUMN} := {search_vector_sql(table, 'NEW')};\n    RETURN NEW;\nEND\n"
+        f"$$ LANGUAGE plpgsql",
+        f"DROP TRIGGER IF EXISTS {function} ON {table}",
+        f"CREATE TRIGGER {function} BEFORE INSERT OR UPDATE OF {', '.join(sources)} ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION {function}()",
+    ]
+
+
+def select_sql(table, columns, extra=()):
+    # SELECT of job columns (then any `extra` expressions) with content-addressed fields joined back in
+    # from their side tables
+    selected, joins = [], []
+    for name in columns:
+        if name in CONTENT_FIELDS:
+            side = content_table(table, name)
+            selected.append(f"{side}.{name}")
+            joins.append(f" LEFT JOIN {side} ON {side}.hash = {table}.{CONTENT_FIELDS[name]}")
+        else:
+            selected.append(f"{table}.{name}")
+    return f"SELECT {', '.join(selected + list(extra))} FROM {table}{''.join(joins)}"
+
+
+def column_type(job_field):
+    # Column type without constraints, as used by ALTER TABLE
+    return job_field.sql_type.replace(' PRIMARY KEY', '')
+
+
+# information_schema.columns.data_type of the column types that PostgreSQL reports under another name
+INFORMATION_SCHEMA_TYPES = {
+    'VARCHAR(255)': 'character varying',
+    'timestamptz': 'timestamp with time zone',
+    'text COLLATE "C"': 'text',
+}
+
+
+def migrate_table_sql(table, existing):
+    # ALTER TABLE statements bringing a table with `existing` {column: data_type} up to JOB_FIELDS:
+    # missing columns are added and columns of another type converted. Empty when already up to date.
+    statements = []
+    for job_field in STORED_FIELDS:
+        sql_type = column_type(job_field)
+        current = existing.get(job_field.name)
+        if current is None:
+            statements.append(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {job_field.name} {sql_type}")
+        elif current != INFORMATION_SCHEMA_TYPES.get(sql_type, sql_type):
+            statements.append(
+                f"ALTER TABLE {table} ALTER COLUMN {job_field.name} TYPE {sql_type} "
+                f"USING NULLIF({job_field.name}::text, '')::{sql_type}"
+            )
+    # Content fields still stored inline (tables created before CONTENT_FIELDS): move the distinct
+    # values to the side table, point the rows at them and drop the inline column
+    for name, hash_name in CONTENT_FIELDS.items():
+        if name in existing:
+            digest = CONTENT_HASH_SQL.format(column=name)
+            statements += [
+                f"INSERT INTO {content_table(table, name)} (hash, {name}) "
+                f"SELECT DISTINCT {digest}, {name} FROM {table} WHERE {name} IS NOT NULL ON CONFLICT DO NOTHING",
+                f"UPDATE {table} SET {hash_name} = {digest} WHERE {name} IS NOT NULL",
+                f"ALTER TABLE {table} DROP COLUMN {name}",
+            ]
+    # Tables created before full-text search: add the vector and fill it for the rows already there
+    if SEARCH_COLUMN not in existing:
+        statements += [
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {SEARCH_COLUMN} tsvector",
+            f"UPDATE {table} SET {SEARCH_COLUMN} = {search_vector_sql(table, table)}",
+        ]
+    return statements
+
+
+def index_name(table, column):
+    # Managed indexes are named <table>_<column>_idx
+    return f"{table}_{column}_idx"
+
+
+def create_index_sql(table):
+    # {index name: CREATE INDEX statement} for every indexed field; jsonb arrays get GIN (jsonb_path_ops, for @>)
+    statements = {}
+    for job_field in JOB_FIELDS:
+        name = index_name(table, job_field.name)
+        if job_field.index == 'gin':
+            statements[name] = f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({job_field.name} jsonb_path_ops)"
+        elif job_field.index:
+            statements[name] = f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({job_field.name})"
+    name = index_name(table, SEARCH_COLUMN)
+    statements[name] = f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({SEARCH_COLUMN})"
+    return statements
+
+
+def mongo_index_specs():
+    # {index name: keys} for the collection indexes matching the table's
+    # (arrays become multikey indexes); locations get a 2dsphere index in place of the geohash one
+    specs = {
+        f"jobs_{job_field.name}": [(job_field.name, 1)] for job_field in JOB_FIELDS if job_field.index and not job_field.geo
+    }
+    specs[f"jobs_{LOCATION_FIELD}"] = [(LOCATION_FIELD, '2dsphere')]
+    return specs
+
+
+def rollup_table(table, kind):
+    # Rollup tables: raw_table_counts (dimension, value, jobs), raw_table_sketches (measure, currency, bucket, jobs)
+    return f"{table}_{kind}"
+
+
+def rollup_signature():
+    # What the rollups aggregate; stored as a comment on the counts table so a change triggers a rebuild
+    return (
+        f"counts: {', '.join(COUNT_FIELDS)}; "
+        f"sketches: {', '.join(SKETCH_FIELDS)} by {SKETCH_GROUP} at {SKETCH_ACCURACY}"
+    )
+
+
+def sketch_value(bucket):
+    # Value a bucket stands for, within SKETCH_ACCURACY of every value in it (bucket i holds gamma^(i-1) < x <= gamma^i)
+    return 2 * SKETCH_GAMMA ** bucket / (SKETCH_GAMMA + 1)
+
+
+def create_rollup_tables_sql(table):
+    return [
+        f"CREATE TABLE IF NOT EXISTS {rollup_table(table, 'counts')} (\n"
+        f"    dimension text,\n    value text,\n    jobs bigint NOT NULL,\n    PRIMARY KEY (dimension, value)\n)",
+        f"CREATE TABLE IF NOT EXISTS {rollup_table(table, 'sketches')} (\n"
+        f"    measure text,\n    currency text,\n    bucket integer,\n    jobs bigint NOT NULL,\n"
+        f"    PRIMARY KEY (measure, currency, bucket)\n)",
+    ]
+
+
+def rollup_deltas_sql(table, sources):
+    # INSERT ... ON CONFLICT statements adding the jobs of `sources` ([(relation, +1 or -1)]) to both rollups.
+    # Changes are summed per rollup row first, so an update that leaves a job's values alone writes nothing,
+    # and applied in key order so concurrent batches lock rollup rows in the same order.
+    counts, sketches = [], []
+    for relation, sign in sources:
+        for name in COUNT_FIELDS:
+            if FIELDS_BY_NAME[name].json:
+                counts.append(
+                    f"SELECT '{name}', element, {sign} FROM {relation} CROSS JOIN LATERAL ("
+                    f"SELECT DISTINCT btrim(element) FROM jsonb_array_elements_text("
+                    f"CASE jsonb_typeof({relation}.{name}) WHEN 'array' THEN {relation}.{name} END) AS element"
+                    f") AS elements (element)"
+                )
+            else:
+                counts.append(f"SELECT '{name}', {name}, {sign} FROM {relation}")
+        for name in SKETCH_FIELDS:
+            sketches.append(
+                f"SELECT '{name}', coalesce({SKETCH_GROUP}, ''), "
+                f"ceil(ln({name}) / ln({SKETCH_GAMMA!r}))::integer, {sign} FROM {relation} WHERE {name} > 0"
+            )
+    return [
+        f"INSERT INTO {rollup_table(table, 'counts')} AS rollup (dimension, value, jobs)\n"
+        f"SELECT dimension, value, sum(delta) FROM (\n    " + "\n    UNION ALL ".join(counts) + "\n"
+        f") AS changes (dimension, value, delta) WHERE value IS NOT NULL AND value <> ''\n"
+        f"GROUP BY dimension, value HAVING sum(delta) <> 0 ORDER BY dimension, value\n"
+        f"ON CONFLICT (dimension, value) DO UPDATE SET jobs = rollup.jobs + EXCLUDED.jobs",
+        f"INSERT INTO {rollup_table(table, 'sketches')} AS rollup (measure, currency, bucket, jobs)\n"
+        f"SELECT measure, currency, bucket, sum(delta) FROM (\n    " + "\n    UNION ALL ".join(sketches) + "\n"
+        f") AS changes (measure, currency, bucket, delta)\n"
+        f"GROUP BY measure, currency, bucket HAVING sum(delta) <> 0 ORDER BY measure, currency, bucket\n"
+        f"ON CONFLICT (measure, currency, bucket) DO UPDATE SET jobs = rollup.jobs + EXCLUDED.jobs",
+    ]
+
+
+def rollup_trigger_sql(table):
+    # Statements (re)creating the statement-level triggers that apply each write to the rollups, from its
+    # transition tables (PostgreSQL only allows those on single-event triggers, hence one per event),
+    # and the one emptying the rollups along with the table
+    function = f"{table}_rollups"
+    branches = {
+        'INSERT': [('new_rows', 1)],
+        'UPDATE': [('new_rows', 1), ('old_rows', -1)],
+        'DELETE': [('old_rows', -1)],
+    }
+    body = "\n".join(
+        f"    {'IF' if index == 0 else 'ELSIF'} TG_OP = '{event}' THEN\n" + "".join(
+            f"        {statement};\n" for statement in rollup_deltas_sql(table, sources)
+        )
+        for index, (event, sources) in enumerate(branches.items())
+    )
+    statements = [
+        f"CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$\n"
+        f"BEGIN\n{body}\n    END IF;\n    RETURN NULL;\nEND\n"
+        f"$$ LANGUAGE plpgsql",
+    ]
+    transitions = {
+        'INSERT': "NEW TABLE AS new_rows",
+        'UPDATE': "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        'DELETE': "OLD TABLE AS old_rows",
+    }
+    for event, transition in transitions.items():
+        trigger = f"{function}_{event.lower()}"
+        statements += [
+            f"DROP TRIGGER IF EXISTS {trigger} ON {table}",
+            f"CREATE TRIGGER {trigger} AFTER {event} ON {table} REFERENCING {transition} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION {function}()",
+        ]
+    return statements + [
+        f"CREATE OR REPLACE FUNCTION {function}_truncate() RETURNS trigger AS $$\n"
+        f"BEGIN\n    TRUNCATE {rollup_table(table, 'counts')}, {rollup_table(table, 'sketches')};\n"
+        f"    RETURN NULL;\nEND\n$$ LANGUAGE plpgsql",
+        f"DROP TRIGGER IF EXISTS {function}_truncate ON {table}",
+        f"CREATE TRIGGER {function}_truncate AFTER TRUNCATE ON {table} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION {function}_truncate()",
+    ]
+
+
+def rebuild_rollups_sql(table):
+    # Statements recomputing both rollups from the whole table, to run in one transaction. Writes are
+    # blocked meanwhile (reads are not), so no change is counted twice or missed.
+    return [
+        f"LOCK TABLE {table} IN SHARE MODE",
+        f"TRUNCATE {rollup_table(table, 'counts')}, {rollup_table(table, 'sketches')}",
+        *rollup_deltas_sql(table, [(table, 1)]),
+        f"COMMENT ON TABLE {rollup_table(table, 'counts')} IS '{rollup_signature()}'",
+    ]
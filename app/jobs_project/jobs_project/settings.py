@@ -7,3 +7,91 @@ ROBOTSTXT_OBEY = True
 
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 FEED_EXPORT_ENCODING = "utf-8"
+
+# Buffered PostgreSQL writes: rows are upserted in batches of this size,
+# or after this many seconds, whichever comes first.
+POSTGRES_BATCH_SIZE = 500
+POSTGRES_FLUSH_INTERVAL = 5.0
+
+# Buffered MongoDB writes, flushed independently of PostgreSQL.
+MONGO_BATCH_SIZE = 1000
+MONGO_FLUSH_INTERVAL = 5.0
+
+# Deduplication: req_ids seen in this crawl are remembered in-process (LRU of
+# this size); new ones are claimed in Redis in batches, one atomic script call
+# per batch. A claim expires after DEDUP_CLAIM_TTL seconds unless the job is stored.
+# DEDUP_MODE 'presence' skips any req_id already cached; 'content' and
+# 'update_date' cache a fingerprint per req_id and rewrite jobs whose
+# content (or update_date) changed since the last crawl. 'content' is opt-in:
+# hashing every job costs about half the pipeline's throughput.
+DEDUP_MODE = 'presence'
+DEDUP_CACHE_SIZE = 100000
+DEDUP_CLAIM_BATCH_SIZE = 100
+DEDUP_CLAIM_TTL = 600
+
+# The Redis dedup cache keeps req_ids as fields of DEDUP_BUCKETS small hashes
+# under DEDUP_NAMESPACE (about 100 jobs per bucket keeps Redis' compact hash
+# encoding). Give a feed its own namespace (-s DEDUP_NAMESPACE=jobs:dedup:<feed>)
+# to track, expire or clear it on its own. Jobs no crawl has seen for
+# DEDUP_TTL to 2 * DEDUP_TTL seconds are forgotten (0 keeps them forever).
+# Move the per-job keys of earlier versions once with
+# `python -m jobs_project.dedup migrate`.
+DEDUP_NAMESPACE = 'jobs:dedup'
+DEDUP_BUCKETS = 65536
+DEDUP_TTL = 2592000
+
+# Parse feeds incrementally (one job at a time) instead of loading the whole
+# document with json.loads.
+JOBS_FEED_STREAMING = True
+
+# AsyncJobsProjectPipeline only: size of the thread pool used for store I/O and
+# the number of claim/write batches allowed in flight before items wait.
+PIPELINE_THREADS = 4
+PIPELINE_MAX_IN_FLIGHT = 8
+
+# Connection pools shared by the pipeline's writers (and its thread pool in
+# AsyncJobsProjectPipeline). Dropped connections are retried with backoff.
+POSTGRES_POOL_SIZE = 4
+REDIS_MAX_CONNECTIONS = 16
+MONGO_MAX_POOL_SIZE = 50
+
+# Pipeline instrumentation: per-stage timings (dedup, store writes, cache set)
+# and item counts go to the Scrapy stats and a throughput summary logged every
+# METRICS_SUMMARY_INTERVAL seconds. Set METRICS_PORT to also serve them in
+# Prometheus text format at http://METRICS_HOST:METRICS_PORT/metrics.
+METRICS_SUMMARY_INTERVAL = 60.0
+METRICS_PORT = 0
+METRICS_HOST = '127.0.0.1'
+
+# Distributed crawling: with FEED_QUEUE_ENABLED the spider takes feed URLs from
+# a Redis list shared by every worker (push them with
+# `python -m jobs_project.feed_queue push '/data/feeds/*.json'`). Finished
+# feeds are recorded, and a restarted worker first requeues the feeds it had
+# taken (tracked per FEED_QUEUE_WORKER_ID, default: the hostname). With
+# FEED_QUEUE_WAIT the worker stays up polling for new feeds once the queue is
+# empty. Workers share the Redis dedup cache, so each job is written once.
+FEED_QUEUE_ENABLED = False
+FEED_QUEUE_KEY = 'jobs:feeds'
+FEED_QUEUE_WORKER_ID = None
+FEED_QUEUE_WAIT = False
+
+# Local feeds passed with `-a feeds=<dir|glob|file>` or `-a manifest=<file>`
+# are read through memory-mapped files instead of the downloader, with up to
+# this many files opened (and read ahead) at once.
+FEED_OPEN_CONCURRENCY = 8
+
+# Jobs a store rejects (after the per-row retry) are appended to
+# SPOOL_DIR/<store>.jsonl instead of being dropped; replay them with
+# `python -m jobs_project.spool replay`. AsyncJobsProjectPipeline also gives
+# every store its own queue of at most SINK_QUEUE_BATCHES batches. A full
+# queue holds ingest back; only a batch that waits SINK_QUEUE_TIMEOUT seconds
+# for room is spooled, so a stuck store does not stop the other one.
+# Set SPOOL_DIR to None to disable spooling (full queues then wait).
+SPOOL_DIR = 'spool'
+SINK_QUEUE_BATCHES = 4
+SINK_QUEUE_TIMEOUT = 30.0
+
+# `python query.py find|serve` caches lookup results in Redis under this
+# prefix. The pipeline bumps the cache version whenever it stores new or
+# changed jobs, so cached results never outlive the data they were read from.
+QUERY_CACHE_KEY = 'jobs:query'
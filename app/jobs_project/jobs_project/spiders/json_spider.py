@@ -1,7 +1,13 @@
 from pathlib import Path
+import io
 import scrapy
 import json
-from jobs_project.items import JobsProjectItem
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from jobs_project.feed_queue import FeedQueue, redis_from_env
+from jobs_project.feeds import iter_jobs
+from jobs_project.local_feeds import iter_open_feeds, resolve_sources
+from jobs_project.schema import record_from_feed
 
 class Jobpider(scrapy.Spider):
     name = 'job_spider'  # Name of the spider
@@ -11,11 +17,45 @@ class Jobpider(scrapy.Spider):
         },
     }
 
-    def __init__(self, **kwargs):
-        # Initializes the spider with any additional arguments passed during runtime
+    def __init__(self, feeds=None, manifest=None, **kwargs):
+        # Initializes the spider with any additional arguments passed during runtime.
+        # feeds: a directory, glob or file (comma-separated for several); manifest: a file listing feeds.
         super().__init__(**kwargs)
+        self.feed_queue = None
+        self.parsed_feeds = []  # Queued feeds whose jobs have all been handed to the pipeline
+        self.local_feeds = resolve_sources(feeds, manifest) if feeds or manifest else None
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        if crawler.settings.getbool('FEED_QUEUE_ENABLED'):
+            # Distributed mode: feeds come from the shared Redis queue instead of the list below
+            spider.redis = redis_from_env()
+            spider.feed_queue = FeedQueue(spider.redis, crawler.settings.get('FEED_QUEUE_KEY', 'jobs:feeds'),
+                                          crawler.settings.get('FEED_QUEUE_WORKER_ID'))
+            crawler.signals.connect(spider.spider_idle, signal=signals.spider_idle)
+            crawler.signals.connect(spider.spider_closed, signal=signals.spider_closed)
+        return spider
 
     def start_requests(self):
+        if self.feed_queue is not None:
+            resumed = self.feed_queue.resume()
+            if resumed:
+                self.logger.info(f"Resuming {resumed} feeds left unfinished by worker {self.feed_queue.worker_id}")
+            # Scrapy pulls start requests only as download slots free up, so each worker takes
+            # the next feed when it has room for it
+            while True:
+                requests = self.queued_requests(1)
+                if not requests:
+                    return
+                yield from requests
+
+        if self.local_feeds is not None:
+            # Local files skip the downloader: one placeholder request reads them all through parse_local_feeds
+            self.logger.info(f"Reading {len(self.local_feeds)} local feeds")
+            yield scrapy.Request(url='data:,', callback=self.parse_local_feeds, dont_filter=True)
+            return
+
         # List of URLs to start scraping
         urls = [
             'file:///app/data/s01.json',  # Path to the first JSON file
@@ -26,57 +66,67 @@ class Jobpider(scrapy.Spider):
         for url in urls:
             yield scrapy.Request(url=url, callback=self.parse_page)
 
+    def queued_requests(self, count):
+        return [
+            scrapy.Request(url=url, callback=self.parse_page, errback=self.feed_failed,
+                           dont_filter=True, meta={'queued_feed': url})
+            for url in self.feed_queue.take(count)
+        ]
+
+    def spider_idle(self):
+        # With FEED_QUEUE_WAIT the worker keeps polling the queue for feeds pushed later instead of stopping
+        if not self.settings.getbool('FEED_QUEUE_WAIT'):
+            return
+        for request in self.queued_requests(self.settings.getint('CONCURRENT_REQUESTS', 16)):
+            self.crawler.engine.crawl(request)
+        raise DontCloseSpider
+
+    def feed_failed(self, failure):
+        url = failure.request.meta.get('queued_feed')
+        self.logger.error(f"Feed {failure.request.url} failed: {failure.getErrorMessage()}")
+        if url is not None:
+            self.feed_queue.fail(url)
+
+    def spider_closed(self, spider):
+        self.redis.close()
+
+    def parse_local_feeds(self, response):
+        # Parse local feed files straight from memory-mapped reads, opening the next files ahead on threads
+        concurrency = self.settings.getint('FEED_OPEN_CONCURRENCY', 8)
+        for path, opened in iter_open_feeds(self.local_feeds, concurrency):
+            try:
+                yield from self.parse_feed(opened.result())
+            except Exception as e:
+                self.logger.error(f"Error reading feed {path}: {e}")
+
     def parse_page(self, response):
         # Parse the JSON response and extract job data
-        data = json.loads(response.text)
+        yield from self.parse_feed(response.body)
+
+        # Every job of a queued feed has been handed to the pipeline. It stays in this worker's processing
+        # list (and is requeued after a crash) until the pipeline has stored them, see finish_feeds.
+        if 'queued_feed' in response.meta:
+            self.parsed_feeds.append(response.meta['queued_feed'])
+
+    def finish_feeds(self, failed=False):
+        # Called by the pipeline once every job it was handed is settled: the feeds parsed until then are
+        # done, or failed when some of their jobs could not be stored (failed feeds can be pushed again)
+        feeds, self.parsed_feeds = self.parsed_feeds, []
+        for url in feeds:
+            if failed:
+                self.feed_queue.fail(url)
+            else:
+                self.feed_queue.finish(url)
+
+    def parse_feed(self, body):
+        # Job records from a feed's bytes (a bytes object or a memory-mapped file), without decoding it to text first
+        if self.settings.getbool('JOBS_FEED_STREAMING', True):
+            # Walk jobs[*] straight from the bytes, one job object at a time
+            jobs = iter_jobs(io.BytesIO(body) if isinstance(body, bytes) else body)
+        else:
+            jobs = json.loads(bytes(body)).get('jobs', [])  # Ensure 'jobs' key exists
 
         # Loop through the jobs in the JSON data
-        for job in data.get('jobs', []):  # Ensure 'jobs' key exists
-            job_data = job.get('data', {})  # Get the job details
-            
-            # Create an item to store the job data
-            item = JobsProjectItem()
-            
-            # Extract relevant fields from the job data and assign to item
-            item['slug'] = job_data.get('slug')
-            item['language'] = job_data.get('language')
-            item['languages'] = job_data.get('languages')
-            item['req_id'] = job_data.get('req_id')
-            item['title'] = job_data.get('title')
-            item['description'] = job_data.get('description')
-            item['street_address'] = job_data.get('street_address')
-            item['city'] = job_data.get('city')
-            item['state'] = job_data.get('state')
-            item['country_code'] = job_data.get('country_code')
-            item['postal_code'] = job_data.get('postal_code')
-            item['location_type'] = job_data.get('location_type')
-            item['latitude'] = job_data.get('latitude')
-            item['longitude'] = job_data.get('longitude')
-            item['categories'] = job_data.get('categories')
-            item['tags'] = job_data.get('tags')
-            item['tags5'] = job_data.get('tags5')
-            item['tags6'] = job_data.get('tags6')
-            item['brand'] = job_data.get('brand')
-            item['promotion_value'] = job_data.get('promotion_value')
-            item['salary_currency'] = job_data.get('salary_currency')
-            item['salary_value'] = job_data.get('salary_value')
-            item['salary_min_value'] = job_data.get('salary_min_value')
-            item['salary_max_value'] = job_data.get('salary_max_value')
-            item['benefits'] = job_data.get('benefits')
-            item['employment_type'] = job_data.get('employment_type')
-            item['hiring_organization'] = job_data.get('hiring_organization')
-            item['source'] = job_data.get('source')
-            item['apply_url'] = job_data.get('apply_url')
-            item['internal'] = job_data.get('internal')
-            item['searchable'] = job_data.get('searchable')
-            item['applyable'] = job_data.get('applyable')
-            item['li_easy_applyable'] = job_data.get('li_easy_applyable')
-            item['ats_code'] = job_data.get('ats_code')
-            item['update_date'] = job_data.get('update_date')
-            item['create_date'] = job_data.get('create_date')
-            item['category'] = job_data.get('category')
-            item['full_location'] = job_data.get('full_location')
-            item['short_location'] = job_data.get('short_location')
-
-            # Yield the item to be processed further
-            yield item
\ No newline at end of file
+        for job in jobs:
+            # Build the job record from its details in a single pass and yield it to the pipeline
+            yield record_from_feed(job.get('data', {}))
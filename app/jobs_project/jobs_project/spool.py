@@ -0,0 +1,136 @@
+import argparse
+import glob
+import os
+import threading
+import time
+from itertools import islice
+
+from infra.codec import codec
+from jobs_project.schema import COLUMN_NAMES, KEY_FIELD, build_document, build_feed_document, build_row, record_from_feed
+
+
+class Spool:
+    def __init__(self, directory, name):
+        # Append-only JSON-lines file of job documents a sink could not take, replayed later.
+        # <directory>/<name>.jsonl receives new jobs; a replay moves it aside to <name>.<time>.replay first.
+        self.directory = directory
+        self.name = name
+        self.path = os.path.join(directory, f"{name}.jsonl")
+        self.lock = threading.Lock()  # Batches are spooled from the pipeline's worker threads
+
+    def append(self, records):
+        # Durably append a batch of records: one write and one fsync per batch
+        data = ''.join(codec.dumps(build_feed_document(record)) + '\n' for record in records)
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+
+    def replay_files(self):
+        # Files left by an interrupted replay first, then the current spool moved aside
+        files = sorted(glob.glob(os.path.join(self.directory, f"{glob.escape(self.name)}.*.replay")))
+        with self.lock:
+            if os.path.exists(self.path):
+                replay = os.path.join(self.directory, f"{self.name}.{time.time_ns()}.replay")
+                os.replace(self.path, replay)
+                files.append(replay)
+        return files
+
+    def replay(self, write_batch, batch_size=500, logger=print):
+        # Write spooled jobs back with write_batch(records); batches that fail again are re-spooled.
+        # Upserts are idempotent, so a replay interrupted half way can simply run again.
+        replayed = failed = 0
+        for path in self.replay_files():
+            with open(path, encoding='utf-8') as file:
+                lines = (line for line in file if line.strip())
+                while True:
+                    records = []
+                    for line in islice(lines, batch_size):
+                        try:
+                            records.append(record_from_feed(codec.loads(line)))
+                        except ValueError:
+                            logger(f"Skipping a damaged line in {path}")
+                    if not records:
+                        break
+                    try:
+                        write_batch(records)
+                        replayed += len(records)
+                    except Exception as e:
+                        logger(f"Error replaying {len(records)} jobs from {path}, spooling them again: {e}")
+                        self.append(records)
+                        failed += len(records)
+            os.remove(path)
+        return replayed, failed
+
+    def __len__(self):
+        # Jobs waiting in the spool, including files of an unfinished replay
+        count = 0
+        for path in [self.path] + glob.glob(os.path.join(self.directory, f"{glob.escape(self.name)}.*.replay")):
+            if os.path.exists(path):
+                with open(path, 'rb') as file:
+                    count += sum(1 for line in file if line.strip())
+        return count
+
+
+if __name__ == "__main__":
+    from infra.mongodb_connector import MongoDBConnector
+    from infra.postgresql_connector import PostgresConnector
+    from infra.query_cache import QueryCache
+    from jobs_project.dedup import ContentStore, write_mongo_contents, write_postgres_contents
+    from jobs_project.feed_queue import redis_from_env
+
+    parser = argparse.ArgumentParser(description="Replay jobs spooled by the pipeline into PostgreSQL and MongoDB.")
+    parser.add_argument('command', choices=['replay', 'status'])
+    parser.add_argument('--dir', default='spool', help="Spool directory (SPOOL_DIR)")
+    parser.add_argument('--sink', choices=['postgresql', 'mongodb'], action='append',
+                        help="Sink to replay (repeatable; default: both)")
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--query-cache-key', default='jobs:query',
+                        help="query.py's result cache (QUERY_CACHE_KEY), retired after a replay if REDIS_HOST is set")
+    args = parser.parse_args()
+
+    sinks = args.sink or ['postgresql', 'mongodb']
+    if args.command == 'status':
+        for sink in sinks:
+            print(f"{sink}: {len(Spool(args.dir, sink))} jobs spooled")
+    else:
+        # Jobs written since they were spooled may be newer than the spooled copies: those are kept
+        total = 0
+        for sink in sinks:
+            spool = Spool(args.dir, sink)
+            if sink == 'postgresql':
+                store = PostgresConnector(
+                    host=os.getenv('POSTGRES_HOST'), port=int(os.getenv('POSTGRES_PORT')),
+                    user=os.getenv('POSTGRES_USER'), password=os.getenv('POSTGRES_PASSWORD'),
+                    database=os.getenv('POSTGRES_DB'),
+                )
+                contents = ContentStore(lambda values: write_postgres_contents(store, 'raw_table', values))
+                def write_batch(records):
+                    contents.store(records)
+                    store.upsert_many('raw_table', COLUMN_NAMES, [build_row(record) for record in records], KEY_FIELD,
+                                      page_size=len(records), newer='update_date')
+            else:
+                store = MongoDBConnector(
+                    host=os.getenv('MONGO_HOST'), port=int(os.getenv('MONGO_PORT')), database=os.getenv('MONGO_DB'),
+                    username=os.getenv('MONGO_USER'), password=os.getenv('MONGO_PASSWORD'),
+                )
+                contents = ContentStore(lambda values: write_mongo_contents(store, 'raw_collection', values))
+                def write_batch(records):
+                    contents.store(records)
+                    store.bulk_upsert('raw_collection', [build_document(record) for record in records], key=KEY_FIELD,
+                                      batch_size=len(records), newer='update_date')
+            try:
+                store.connect()
+                replayed, failed = spool.replay(write_batch, args.batch_size)
+                print(f"{sink}: replayed {replayed} jobs, {failed} spooled again")
+                total += replayed
+            finally:
+                store.close()
+        if total and os.getenv('REDIS_HOST'):
+            redis = redis_from_env()
+            try:
+                QueryCache(redis, args.query_cache_key).bump()  # Cached lookups may miss the replayed jobs
+            finally:
+                redis.close()
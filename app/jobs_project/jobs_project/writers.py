@@ -0,0 +1,54 @@
+import time
+
+
+class BufferedWriter:
+    def __init__(self, name, write_batch, write_one, batch_size=500, flush_interval=5.0, logger=None):
+        # Collect items keyed by req_id and hand them to a store in batches
+        self.name = name
+        self.write_batch = write_batch
+        self.write_one = write_one
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.logger = logger
+        self.buffer = {}
+        self.last_flush = time.monotonic()
+
+    def add(self, key, item):
+        # Buffer an item (a later item with the same key replaces the earlier one); True once a flush is due
+        self.buffer[key] = item
+        return self.is_due()
+
+    def is_due(self):
+        # A flush is due when the batch is full or the flush interval has passed
+        if not self.buffer:
+            return False
+        if len(self.buffer) >= self.batch_size:
+            return True
+        return time.monotonic() - self.last_flush >= self.flush_interval
+
+    def take(self):
+        # Detach the buffered batch so it can be written while new items keep arriving
+        self.last_flush = time.monotonic()
+        batch, self.buffer = self.buffer, {}
+        return batch
+
+    def write(self, batch):
+        # Write a batch, retrying row by row if the batch as a whole fails; returns (written, failed) keys.
+        # Only touches the store, so it can run on a worker thread.
+        try:
+            self.write_batch(list(batch.values()))
+            return list(batch), []
+        except Exception as e:
+            if self.logger:
+                self.logger.warning(f"Batch of {len(batch)} jobs failed in {self.name}, retrying one by one: {e}")
+
+        written, failed = [], []
+        for key, item in batch.items():
+            try:
+                self.write_one(item)
+                written.append(key)
+            except Exception as row_error:
+                if self.logger:
+                    self.logger.error(f"Error writing job {key} to {self.name}: {row_error}")
+                failed.append(key)
+        return written, failed
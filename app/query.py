@@ -1,9 +1,77 @@
+import argparse
+import math
 import psycopg2
-import csv
 import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import groupby, islice
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
 
+from infra.codec import codec
 from infra.postgresql_connector import PostgresConnector
 from infra.mongodb_connector import MongoDBConnector
+from infra.query_cache import QueryCache
+from infra.redis_connector import RedisConnector
+
+sys.path.append(str(Path(__file__).resolve().parent / 'jobs_project'))
+from jobs_project.geo import EARTH_RADIUS_KM, bounding_box, cover_box, valid_coordinates
+from jobs_project.schema import (
+    CONTENT_FIELDS, COUNT_FIELDS, FEED_FIELD_NAMES, FIELD_NAMES, GEOHASH_FIELD, SEARCH_COLUMN, SEARCH_CONFIG,
+    SKETCH_FIELDS, content_table, parse_timestamp, rollup_table, select_sql, sketch_value
+)
+from export_formats import (
+    CHUNK_ROWS, COMPRESSIONS, FORMATS, merge_parts, open_text, output_filename, split_filename, write_columnar, write_csv
+)
+
+# Fixed CSV column order for exports, so rows line up regardless of key order or missing fields.
+# Descriptions are stored once per distinct value and joined back in, so exports keep the feed's fields.
+JOB_COLUMNS = list(FEED_FIELD_NAMES)
+
+POSTGRES_TABLE = "raw_table"
+POSTGRES_CSV = "postgre_processed_data.csv"
+MONGO_COLLECTION = "raw_collection"
+MONGO_CSV = "processed_mongodb_data.csv"
+
+# Columns returned by job lookups unless `fields` asks for others (description is left out by default)
+RESULT_COLUMNS = (
+    'req_id', 'title', 'brand', 'city', 'state', 'country_code', 'employment_type', 'categories',
+    'salary_currency', 'salary_min_value', 'salary_max_value', 'apply_url', 'update_date', 'create_date',
+)
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+# Salary percentiles reported by the rollup stats
+PERCENTILES = (0.25, 0.5, 0.75, 0.9, 0.99)
+
+def timestamp_param(value):
+    parsed = parse_timestamp(value)
+    if parsed is None:
+        raise ValueError(f"Not a date or timestamp: {value!r}")
+    return parsed.isoformat()
+
+def json_array_param(value):
+    return codec.dumps([value])
+
+def category_param(value):
+    # categories holds objects ([{"name": "Operations"}]), so containment has to match one by name
+    return codec.dumps([{'name': value.strip()}])
+
+# Lookup filters: name -> (SQL condition on raw_table, normalizer of the parameter). Each one is
+# served by an index from the schema (B-tree, or GIN for the jsonb arrays).
+FILTERS = {
+    'city': ("city = %s", str),
+    'state': ("state = %s", str),
+    'country_code': ("country_code = %s", str.upper),
+    'employment_type': ("employment_type = %s", str),
+    'category': ("categories @> %s::jsonb", category_param),
+    'tag': ("tags @> %s::jsonb", json_array_param),
+    'since': ("update_date >= %s", timestamp_param),
+    'until': ("update_date < %s", timestamp_param),
+    'posted_since': ("create_date >= %s", timestamp_param),
+}
 
 # Class to handle CSV writing operations
 class ToCSV:
@@ -18,43 +86,490 @@ class ToCSV:
         self.cursor = None
 
     @staticmethod
-    def write_to_csv(data, csv_filename, headers=None):
-        # Writes data to a CSV file. If headers are provided, they will be written as the first row.
+    def write_to_csv(data, csv_filename, headers=None, compression='none'):
+        # Writes data to a CSV file (gzip or zstd compressed if requested). If headers are provided, they will be written as the first row.
         try:
-            with open(csv_filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                if headers:
-                    writer.writerow(headers)  # Write headers if provided
-                writer.writerows(data)  # Write the data rows
+            write_csv(data, csv_filename, headers, compression)
             print(f"Data successfully written to {csv_filename}")
         except Exception as error:
             print(f"Error writing to CSV: {error}")
             raise
 
-if __name__ == "__main__":
-    # PostgreSQL configuration
-    postgre_config = {
-        'host': os.getenv('POSTGRES_HOST'),
-        'port': int(os.getenv('POSTGRES_PORT')),
-        'user': os.getenv('POSTGRES_USER'),
-        'password': os.getenv('POSTGRES_PASSWORD'),
-        'database': os.getenv('POSTGRES_DB'),
+    @staticmethod
+    def copy_to_csv(postgre, query, csv_filename, params=None, compression='none'):
+        # Let PostgreSQL render the CSV itself (COPY ... TO STDOUT) and stream it straight to the file
+        try:
+            with open_text(csv_filename, 'w', compression) as file:
+                postgre.copy_to(query, file, params)
+            print(f"Data successfully written to {csv_filename}")
+        except Exception as error:
+            print(f"Error writing to CSV: {error}")
+            raise
+
+    @staticmethod
+    def write_to_columnar(data, filename, headers, fmt='parquet', compression='zstd', chunk_rows=CHUNK_ROWS):
+        # Writes rows to Parquet or Arrow IPC in record batches of chunk_rows, dictionary-encoding low-cardinality columns
+        try:
+            write_columnar(data, filename, headers, fmt, compression, chunk_rows)
+            print(f"Data successfully written to {filename}")
+        except Exception as error:
+            print(f"Error writing to {fmt}: {error}")
+            raise
+
+def write_rows(rows, filename, headers, fmt='csv', compression='none', chunk_rows=CHUNK_ROWS):
+    if fmt == 'csv':
+        ToCSV.write_to_csv(rows, filename, headers=headers, compression=compression)
+    else:
+        ToCSV.write_to_columnar(rows, filename, headers, fmt, compression, chunk_rows)
+
+def export_postgres(postgre, query, filename, mode='copy', itersize=2000, params=None,
+                    fmt='csv', compression='none', chunk_rows=CHUNK_ROWS):
+    # Export a PostgreSQL query in constant memory, via COPY (CSV only) or a server-side cursor
+    if mode == 'copy' and fmt == 'csv':
+        ToCSV.copy_to_csv(postgre, query, filename, params, compression)
+    else:
+        headers, rows = postgre.stream_data(query, params, itersize=itersize)
+        write_rows(rows, filename, headers, fmt, compression, chunk_rows)
+
+def join_contents(mongo, collection, documents, columns, batch_size=1000, cache_size=10000):
+    # Put content-addressed fields (descriptions) back into documents that carry only their hash,
+    # one lookup per batch for the hashes not seen recently
+    joined = [(name, CONTENT_FIELDS[name], {}) for name in columns if name in CONTENT_FIELDS]
+    while True:
+        batch = list(islice(documents, batch_size))
+        if not batch:
+            return
+        for name, hash_name, values in joined:
+            missing = list({doc[hash_name] for doc in batch if doc.get(hash_name) and doc[hash_name] not in values})
+            if missing:
+                if len(values) + len(missing) > cache_size:
+                    values.clear()
+                side = mongo.iter_documents(content_table(collection, name), {'_id': {'$in': missing}}, batch_size=batch_size)
+                values.update((content['_id'], content.get(name)) for content in side)
+            for doc in batch:
+                doc[name] = values.get(doc.get(hash_name))
+        yield from batch
+
+def export_mongo(mongo, collection, filename, columns=JOB_COLUMNS, batch_size=1000, query=None,
+                 fmt='csv', compression='none', chunk_rows=CHUNK_ROWS):
+    # Export a MongoDB collection one cursor batch at a time, projecting only the job columns
+    stored = [CONTENT_FIELDS.get(column, column) for column in columns]
+    projection = {column: 1 for column in stored}
+    projection['_id'] = 0
+    documents = mongo.iter_documents(collection, query or {}, projection, batch_size=batch_size)
+    if any(column in CONTENT_FIELDS for column in columns):
+        documents = join_contents(mongo, collection, iter(documents), columns, batch_size)
+    rows = ([doc.get(column) for column in columns] for doc in documents)
+    write_rows(rows, filename, columns, fmt, compression, chunk_rows)
+
+def normalize_area(near=None, within=None):
+    # Validated [lat, lon, radius_km] and [south, west, north, east] (west > east crosses the antimeridian)
+    area = {}
+    if near is not None:
+        lat, lon, radius_km = (float(value) for value in near)
+        if valid_coordinates(lat, lon) is None or not 0 < radius_km <= math.pi * EARTH_RADIUS_KM:
+            raise ValueError(f"Not a point and radius: {near!r}")
+        area['near'] = [lat, lon, radius_km]
+    if within is not None:
+        south, west, north, east = (float(value) for value in within)
+        if valid_coordinates(south, west) is None or valid_coordinates(north, east) is None or south > north:
+            raise ValueError(f"Not a bounding box (south, west, north, east): {within!r}")
+        area['within'] = [south, west, north, east]
+    return area
+
+def normalize_query(filters, limit=DEFAULT_LIMIT, offset=0, fields=None, text=None, near=None, within=None):
+    # Canonical form of a lookup: known filters only, empty ones dropped, parameters normalized and the
+    # limit clamped, so equivalent requests share one cache entry. `text` makes it a full-text search;
+    # `near` (lat, lon, radius_km) and `within` (south, west, north, east) limit it to an area.
+    normalized = {}
+    for name, value in filters.items():
+        if name not in FILTERS:
+            raise ValueError(f"Unknown filter: {name}")
+        if value is None or not str(value).strip():
+            continue
+        normalized[name] = FILTERS[name][1](str(value).strip())
+    fields = list(fields or RESULT_COLUMNS)
+    unknown = [field for field in fields if field not in FIELD_NAMES]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    query = {
+        'filters': dict(sorted(normalized.items())),
+        'fields': fields,
+        'limit': max(1, min(int(limit), MAX_LIMIT)),
+        'offset': max(0, int(offset)),
+    }
+    if text is not None:
+        query['text'] = ' '.join(text.split())
+        if not query['text']:
+            raise ValueError("Empty search text")
+    query.update(normalize_area(near, within))
+    return query
+
+def cell_condition(cells):
+    # Geohash prefix ranges on the B-tree index: every job inside one of the cells, and a few around them
+    condition = " OR ".join(
+        f"({POSTGRES_TABLE}.{GEOHASH_FIELD} >= %s AND {POSTGRES_TABLE}.{GEOHASH_FIELD} < %s)" for _ in cells
+    )
+    return f"({condition})", [bound for cell in cells for bound in (cell, cell + '~')]
+
+# Great-circle (haversine) distance in km from the point given by the (lat, lat, lon) parameters
+DISTANCE_SQL = (
+    f"2 * {EARTH_RADIUS_KM} * asin(least(1, sqrt("
+    f"power(sin(radians({POSTGRES_TABLE}.latitude - %s) / 2), 2) + cos(radians({POSTGRES_TABLE}.latitude)) * "
+    f"cos(radians(%s)) * power(sin(radians({POSTGRES_TABLE}.longitude - %s) / 2), 2))))"
+)
+
+def filter_query(query):
+    # Parameterized SELECT for a normalized lookup: newest jobs first, or for a search, best matches first
+    # (found through the GIN index on search_vector and ranked by term proximity and field weight)
+    # Areas are pruned to the geohash cells covering them before the exact distance or bounds check.
+    extra, select_params = [], []
+    conditions = [FILTERS[name][0] for name in query['filters']]
+    params = list(query['filters'].values())
+    order = "update_date DESC NULLS LAST, req_id"
+    if 'near' in query:
+        lat, lon, radius_km = query['near']
+        extra.append(f"{DISTANCE_SQL} AS distance_km")
+        select_params += [lat, lat, lon]
+        conditions.append(f"{DISTANCE_SQL} <= %s")
+        params += [lat, lat, lon, radius_km]
+        order = "distance_km, req_id"
+        boxes = [bounding_box(lat, lon, radius_km)]
+    else:
+        boxes = []
+    if 'within' in query:
+        south, west, north, east = query['within']
+        joiner = "AND" if west <= east else "OR"
+        conditions.append(f"{POSTGRES_TABLE}.latitude BETWEEN %s AND %s")
+        conditions.append(f"({POSTGRES_TABLE}.longitude >= %s {joiner} {POSTGRES_TABLE}.longitude <= %s)")
+        params += [south, north, west, east]
+        boxes.append(query['within'])
+    for box in boxes:
+        cells = cover_box(*box)
+        if cells:
+            condition, cell_params = cell_condition(cells)
+            conditions.append(condition)
+            params += cell_params
+    source = select_sql(POSTGRES_TABLE, query['fields'], extra)
+    if 'text' in query:
+        source += f", websearch_to_tsquery('{SEARCH_CONFIG}', %s) AS search_terms"
+        conditions.insert(0, f"{POSTGRES_TABLE}.{SEARCH_COLUMN} @@ search_terms")
+        params.insert(0, query['text'])
+        order = f"ts_rank_cd({POSTGRES_TABLE}.{SEARCH_COLUMN}, search_terms) DESC, req_id"
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f"{source}{where} ORDER BY {order} LIMIT %s OFFSET %s"
+    return sql, select_params + params + [query['limit'], query['offset']]
+
+def run_lookup(postgre, query):
+    # Rows of a normalized lookup as JSON-ready dicts
+    sql, params = filter_query(query)
+    columns = query['fields'] + (['distance_km'] if 'near' in query else [])
+    return [
+        {column: value.isoformat() if isinstance(value, datetime) else value
+         for column, value in zip(columns, row)}
+        for row in postgre.fetch_data(sql, params)
+    ]
+
+def lookup(postgre, query, cache=None):
+    # (jobs, cache hit) for a normalized lookup, through the cache when there is one
+    if cache is None:
+        return run_lookup(postgre, query), False
+    return cache.cached({'jobs': query}, lambda: run_lookup(postgre, query))
+
+def find_jobs(postgre, cache=None, limit=DEFAULT_LIMIT, offset=0, fields=None, **filters):
+    # Jobs matching every given filter (see FILTERS), newest first
+    return lookup(postgre, normalize_query(filters, limit, offset, fields), cache)[0]
+
+def search(postgre, text, cache=None, limit=DEFAULT_LIMIT, offset=0, fields=None, **filters):
+    # Jobs whose title or description match `text`, best matches first. `text` takes web search syntax
+    # (forklift night shift, "night shift", forklift -part-time, forklift or warehouse); filters as in find_jobs.
+    return lookup(postgre, normalize_query(filters, limit, offset, fields, text), cache)[0]
+
+def jobs_near(postgre, lat, lon, radius_km, cache=None, limit=DEFAULT_LIMIT, offset=0, fields=None, **filters):
+    # Jobs within radius_km of (lat, lon), nearest first, each with its distance_km; filters as in find_jobs
+    return lookup(postgre, normalize_query(filters, limit, offset, fields, near=(lat, lon, radius_km)), cache)[0]
+
+def jobs_within(postgre, south, west, north, east, cache=None, limit=DEFAULT_LIMIT, offset=0, fields=None, **filters):
+    # Jobs inside a latitude/longitude box, newest first; filters as in find_jobs
+    query = normalize_query(filters, limit, offset, fields, within=(south, west, north, east))
+    return lookup(postgre, query, cache)[0]
+
+def jobs_in_city(postgre, city, cache=None, **options):
+    return find_jobs(postgre, cache, city=city, **options)
+
+def jobs_in_category(postgre, category, cache=None, **options):
+    return find_jobs(postgre, cache, category=category, **options)
+
+def jobs_since(postgre, since, cache=None, **options):
+    # Jobs updated at or after `since` (a date or ISO timestamp)
+    return find_jobs(postgre, cache, since=since, **options)
+
+def job_counts(postgre, dimension, limit=DEFAULT_LIMIT):
+    # Jobs per value of a rollup dimension (see COUNT_FIELDS), most jobs first, read from the counts rollup
+    # the pipeline's triggers maintain: the cost depends on the number of distinct values, not of jobs
+    if dimension not in COUNT_FIELDS:
+        raise ValueError(f"Unknown dimension: {dimension} (one of {', '.join(COUNT_FIELDS)})")
+    rows = postgre.fetch_data(
+        f"SELECT value, jobs FROM {rollup_table(POSTGRES_TABLE, 'counts')} "
+        f"WHERE dimension = %s AND jobs > 0 ORDER BY jobs DESC, value LIMIT %s",
+        (dimension, max(1, min(int(limit), MAX_LIMIT)))
+    )
+    return [{'value': value, 'jobs': jobs} for value, jobs in rows]
+
+def summarize_sketch(buckets, percentiles=PERCENTILES):
+    # Jobs, min, max and percentiles of a sketch given as (bucket, jobs) in bucket order.
+    # Values are those of their buckets, so within SKETCH_ACCURACY of the exact ones.
+    total = sum(jobs for _, jobs in buckets)
+    summary = {
+        'jobs': total,
+        'min': round(sketch_value(buckets[0][0]), 2),
+        'max': round(sketch_value(buckets[-1][0]), 2),
     }
+    for percentile in percentiles:
+        rank, seen = percentile * (total - 1), 0
+        for bucket, jobs in buckets:
+            seen += jobs
+            if seen > rank:
+                break
+        summary[f"p{percentile * 100:g}"] = round(sketch_value(bucket), 2)
+    return summary
+
+def salary_summary(postgre, currency=None, measures=SKETCH_FIELDS, percentiles=PERCENTILES):
+    # {currency: {measure: summary}} of the salary sketches ('' holds jobs without a currency), read from
+    # the sketches rollup: at most a few hundred buckets per currency and measure, whatever the number of jobs
+    unknown = [measure for measure in measures if measure not in SKETCH_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown measures: {', '.join(unknown)} (one of {', '.join(SKETCH_FIELDS)})")
+    if any(not 0 <= percentile <= 1 for percentile in percentiles):
+        raise ValueError(f"Percentiles must be between 0 and 1: {percentiles!r}")
+    condition, params = "measure = ANY(%s)", [list(measures)]
+    if currency is not None:
+        condition += " AND currency = %s"
+        params.append(currency.strip().upper())
+    rows = postgre.fetch_data(
+        f"SELECT currency, measure, bucket, jobs FROM {rollup_table(POSTGRES_TABLE, 'sketches')} "
+        f"WHERE {condition} AND jobs > 0 ORDER BY currency, measure, bucket",
+        params
+    )
+    summaries = {}
+    for (currency, measure), group in groupby(rows, key=lambda row: row[:2]):
+        summaries.setdefault(currency, {})[measure] = summarize_sketch([row[2:] for row in group], percentiles)
+    return summaries
+
+def rollup_stats(postgre, dimensions=None, currency=None, limit=DEFAULT_LIMIT):
+    # Job counts of the given dimensions (all by default) and the salary summaries, as one JSON-ready dict
+    return {
+        'counts': {dimension: job_counts(postgre, dimension, limit) for dimension in dimensions or COUNT_FIELDS},
+        'salaries': salary_summary(postgre, currency),
+    }
+
+def numbers(value, count):
+    # 'lat,lon,km' -> [lat, lon, km]; None stays None
+    if value is None:
+        return None
+    values = value.split(',')
+    if len(values) != count:
+        raise ValueError(f"Expected {count} comma-separated numbers: {value!r}")
+    return [float(number) for number in values]
+
+def query_from_params(params):
+    # Normalized lookup from URL query parameters (?q=...&city=...&near=lat,lon,km&limit=...&fields=a,b)
+    params = {name: values[0] for name, values in params.items()}
+    options = {
+        'limit': params.pop('limit', DEFAULT_LIMIT),
+        'offset': params.pop('offset', 0),
+        'fields': params.pop('fields').split(',') if params.get('fields') else None,
+        'text': params.pop('q', None),
+        'near': numbers(params.pop('near', None), 3),
+        'within': numbers(params.pop('within', None), 4),
+    }
+    params.pop('fields', None)
+    return normalize_query(params, **options)
+
+def serve(postgre, cache=None, host='127.0.0.1', port=8080):
+    # Small HTTP front end: GET /jobs?city=Berlin&category=Sales&since=2024-01-01&limit=20
+    # and GET /search?q=forklift+night+shift&state=TX; near=lat,lon,km or within=south,west,north,east on either.
+    # GET /stats?dimension=state&currency=USD serves the rollups.
+    # Requests are served on threads sharing the connector's pool, so no more of them than it has connections
+    # query at once (the pool raises instead of waiting when it runs out).
+    connections = threading.BoundedSemaphore(postgre.pool_size)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path not in ('/jobs', '/search', '/stats'):
+                self.send_error(404)
+                return
+            params = parse_qs(url.query)
+            hit = None
+            try:
+                with connections:
+                    if url.path == '/stats':
+                        result = rollup_stats(
+                            postgre, params.get('dimension'), params.get('currency', [None])[0],
+                            params.get('limit', [DEFAULT_LIMIT])[0]
+                        )
+                    else:
+                        if url.path == '/search' and 'q' not in params:
+                            raise ValueError("Missing search text (q)")
+                        jobs, hit = lookup(postgre, query_from_params(params), cache)
+                        result = {'count': len(jobs), 'jobs': jobs}
+                body = codec.dumps(result).encode('utf-8')
+            except ValueError as error:
+                self.send_error(400, str(error))
+                return
+            except Exception as error:  # Pool, database or encoding errors
+                self.log_error("Error serving %s: %r", self.path, error)
+                self.send_error(500)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if hit is not None:
+                self.send_header('X-Cache', 'HIT' if hit else 'MISS')
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Serving job lookups on http://{host}:{port}/jobs")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def key_ranges(split_points):
+    # Turn sorted split points into (lower, upper) req_id ranges; None means unbounded
+    bounds = [None] + list(split_points) + [None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def postgres_split_points(postgre, partitions):
+    # req_id values that cut raw_table into `partitions` equally sized key ranges
+    if partitions < 2:
+        return []
+    fractions = [i / partitions for i in range(1, partitions)]
+    rows = postgre.fetch_data(
+        f"SELECT percentile_disc(%s::float8[]) WITHIN GROUP (ORDER BY req_id) FROM {POSTGRES_TABLE}",
+        (fractions,)
+    )
+    return sorted(set(point for point in rows[0][0] or [] if point is not None))
+
+def mongo_split_points(mongo, collection, partitions):
+    # req_id values that cut the collection into `partitions` roughly equal key ranges
+    if partitions < 2:
+        return []
+    buckets = mongo.aggregate(collection, [{'$bucketAuto': {'groupBy': '$req_id', 'buckets': partitions}}])
+    return [bucket['_id']['min'] for bucket in buckets[1:]]
+
+def postgres_range_query(lower, upper):
+    # SELECT for one req_id key range of raw_table
+    conditions, params = [], []
+    if lower is not None:
+        conditions.append("req_id >= %s")
+        params.append(lower)
+    if upper is not None:
+        conditions.append("req_id < %s")
+        params.append(upper)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"{select_sql(POSTGRES_TABLE, JOB_COLUMNS)}{where}", params
 
+def mongo_range_query(lower, upper):
+    # Filter for one req_id key range of the collection
+    condition = {}
+    if lower is not None:
+        condition['$gte'] = lower
+    if upper is not None:
+        condition['$lt'] = upper
+    return {'req_id': condition} if condition else {}
+
+def part_filename(filename, index):
+    # postgre_processed_data.csv.gz -> postgre_processed_data.part003.csv.gz
+    stem, ext = split_filename(filename)
+    return f"{stem}.part{index:03d}{ext}"
+
+def output_options(args):
+    # Format, compression and chunk size shared by every export; columnar formats default to zstd
+    compression = args.compression or ('none' if args.format == 'csv' else 'zstd')
+    return {'fmt': args.format, 'compression': compression, 'chunk_rows': args.chunk_rows}
+
+def export_postgres_partition(postgre_config, bounds, filename, mode, itersize, options):
+    # Worker process: export one key range of raw_table over its own connection
+    postgre = PostgresConnector(**postgre_config)
+    try:
+        postgre.connect()
+        query, params = postgres_range_query(*bounds)
+        export_postgres(postgre, query, filename, mode=mode, itersize=itersize, params=params, **options)
+    finally:
+        postgre.close()
+    return filename
+
+def export_mongo_partition(mongo_config, bounds, filename, batch_size, options):
+    # Worker process: export one key range of the collection over its own client
+    mongo = MongoDBConnector(**mongo_config)
+    try:
+        mongo.connect()
+        export_mongo(mongo, MONGO_COLLECTION, filename, batch_size=batch_size, query=mongo_range_query(*bounds), **options)
+    finally:
+        mongo.close()
+    return filename
+
+def merge_export_parts(parts, filename, options):
+    # Combine partition files into one output of the same format, keeping only the first CSV header row
+    merge_parts(parts, filename, **options)
+    print(f"Merged {len(parts)} partitions into {filename}")
+
+def run_parallel_export(postgre_config, mongo_config, args):
+    # Export both stores at once, each split into key-range partitions that run in a process pool
+    partitions = args.partitions or args.workers
+    options = output_options(args)
+    postgres_output = output_filename(POSTGRES_CSV, options['fmt'], options['compression'])
+    mongo_output = output_filename(MONGO_CSV, options['fmt'], options['compression'])
+
+    postgre = PostgresConnector(**postgre_config)
+    mongo = MongoDBConnector(**mongo_config)
+    try:
+        postgre.connect()
+        postgre_ranges = key_ranges(postgres_split_points(postgre, partitions))
+        mongo.connect()
+        mongo_ranges = key_ranges(mongo_split_points(mongo, MONGO_COLLECTION, partitions))
+    finally:
+        postgre.close()
+        mongo.close()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        exports = [
+            ('PostgreSQL', postgres_output, [
+                pool.submit(export_postgres_partition, postgre_config, bounds,
+                            part_filename(postgres_output, index), args.postgres_mode, args.itersize, options)
+                for index, bounds in enumerate(postgre_ranges)
+            ]),
+            ('MongoDB', mongo_output, [
+                pool.submit(export_mongo_partition, mongo_config, bounds,
+                            part_filename(mongo_output, index), args.batch_size, options)
+                for index, bounds in enumerate(mongo_ranges)
+            ]),
+        ]
+        for name, filename, futures in exports:
+            try:
+                parts = [future.result() for future in futures]
+                if args.merge:
+                    merge_export_parts(parts, filename, options)
+            except Exception as e:
+                print(f"Unexpected error during {name} processing: {e}")
+
+def run_postgres_export(postgre_config, args):
     # Initialize PostgreSQL connection
     postgre = PostgresConnector(**postgre_config)
-    postgre_query = "SELECT * FROM raw_table;"  # Sample query
+    postgre_query = select_sql(POSTGRES_TABLE, JOB_COLUMNS)
+
+    options = output_options(args)
 
     try:
-        # Fetch data from PostgreSQL
+        # Stream data from PostgreSQL to the output file
         postgre.connect()
-        postgre_data = postgre.fetch_data(postgre_query)
-        
-        if postgre_data:
-            headers = [desc[0] for desc in postgre.cursor.description]  # Get column names as headers
-            ToCSV.write_to_csv(postgre_data, 'postgre_processed_data.csv', headers=headers)
-        else:
-            print("No data found in PostgreSQL.")
+        export_postgres(postgre, postgre_query, output_filename(POSTGRES_CSV, options['fmt'], options['compression']),
+                        mode=args.postgres_mode, itersize=args.itersize, **options)
     except psycopg2.Error as e:
         print(f"PostgreSQL database error: {e}")
     except Exception as e:
@@ -62,6 +577,103 @@ if __name__ == "__main__":
     finally:
         postgre.close()  # Close PostgreSQL connection
 
+def run_mongo_export(mongo_config, args):
+    # Initialize MongoDB connection
+    mongo = MongoDBConnector(**mongo_config)
+    options = output_options(args)
+
+    try:
+        # Stream data from MongoDB to the output file
+        mongo.connect()
+        export_mongo(mongo, MONGO_COLLECTION, output_filename(MONGO_CSV, options['fmt'], options['compression']),
+                     batch_size=args.batch_size, **options)
+    except Exception as e:
+        print(f"Unexpected error during MongoDB processing: {e}")
+    finally:
+        mongo.close()  # Close MongoDB connection
+
+def query_cache_from_env(ttl):
+    # Result cache in the pipeline's Redis, if one is configured
+    if not os.getenv('REDIS_HOST'):
+        return None
+    redis = RedisConnector(host=os.getenv('REDIS_HOST'), port=int(os.getenv('REDIS_PORT', 6379)), db=os.getenv('REDIS_DB', 0))
+    redis.connect()
+    return QueryCache(redis, ttl=ttl)
+
+def run_query_command(postgre_config, args):
+    # `find` and `search` print one lookup as JSON, `stats` the rollups; `serve` answers them over HTTP
+    postgre = PostgresConnector(**postgre_config)
+    cache = None if args.no_cache or args.command == 'stats' else query_cache_from_env(args.cache_ttl)
+    try:
+        postgre.connect()
+        if args.command == 'serve':
+            serve(postgre, cache, args.host, args.port)
+        elif args.command == 'stats':
+            print(codec.dumps(rollup_stats(postgre, args.dimension, args.currency, args.limit)))
+        else:
+            filters = {name: getattr(args, name) for name in FILTERS}
+            fields = args.fields.split(',') if args.fields else None
+            text = (args.text or '') if args.command == 'search' else None
+            query = normalize_query(filters, args.limit, args.offset, fields, text,
+                                    numbers(args.near, 3), numbers(args.within, 4))
+            jobs, hit = lookup(postgre, query, cache)
+            print(codec.dumps({'count': len(jobs), 'cached': hit, 'jobs': jobs}))
+    finally:
+        postgre.close()
+        if cache is not None:
+            cache.redis.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the scraped jobs from PostgreSQL and MongoDB to CSV, Parquet or Arrow IPC, or look jobs up.")
+    parser.add_argument('command', nargs='?', choices=['export', 'find', 'search', 'stats', 'serve'], default='export',
+                        help="export (default) dumps both stores; find and search print matching jobs; "
+                             "stats prints job counts and salary summaries; serve answers GET /jobs, /search and /stats")
+    parser.add_argument('--postgres-mode', choices=['copy', 'cursor'], default='copy',
+                        help="COPY ... TO STDOUT (default) or a named server-side cursor")
+    parser.add_argument('--itersize', type=int, default=2000,
+                        help="Rows fetched per round trip in cursor mode")
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help="Documents fetched per round trip from MongoDB")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes; above 1, both stores are exported in parallel key-range partitions")
+    parser.add_argument('--partitions', type=int, default=None,
+                        help="Partitions per store in parallel mode (defaults to --workers)")
+    parser.add_argument('--merge', action='store_true',
+                        help="Merge partition files into a single file per store")
+    parser.add_argument('--format', choices=FORMATS, default='csv',
+                        help="Output format; parquet and arrow dictionary-encode low-cardinality columns")
+    parser.add_argument('--compression', choices=COMPRESSIONS, default=None,
+                        help="Output compression (default: none for csv, zstd for parquet and arrow)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help="Rows per record batch in parquet and arrow output")
+    lookups = parser.add_argument_group('find, search and serve')
+    lookups.add_argument('--text', help="Search text, e.g. 'forklift night shift' (search)")
+    lookups.add_argument('--near', metavar='LAT,LON,KM', help="Jobs within KM of a point, nearest first")
+    lookups.add_argument('--within', metavar='S,W,N,E', help="Jobs inside a bounding box")
+    for name in FILTERS:
+        lookups.add_argument(f"--{name.replace('_', '-')}", dest=name, help=f"Filter on {name}")
+    lookups.add_argument('--limit', type=int, default=DEFAULT_LIMIT)
+    lookups.add_argument('--offset', type=int, default=0)
+    lookups.add_argument('--fields', help="Comma-separated columns to return")
+    lookups.add_argument('--host', default='127.0.0.1')
+    lookups.add_argument('--port', type=int, default=8080)
+    lookups.add_argument('--cache-ttl', type=int, default=300, help="Seconds a cached result is kept")
+    lookups.add_argument('--no-cache', action='store_true', help="Skip the Redis result cache")
+    stats = parser.add_argument_group('stats')
+    stats.add_argument('--dimension', action='append', choices=COUNT_FIELDS,
+                       help="Count jobs per value of this field (repeatable; default: all)")
+    stats.add_argument('--currency', help="Only summarize salaries in this currency")
+    args = parser.parse_args()
+
+    # PostgreSQL configuration
+    postgre_config = {
+        'host': os.getenv('POSTGRES_HOST'),
+        'port': int(os.getenv('POSTGRES_PORT')),
+        'user': os.getenv('POSTGRES_USER'),
+        'password': os.getenv('POSTGRES_PASSWORD'),
+        'database': os.getenv('POSTGRES_DB'),
+    }
+
     # MongoDB configuration
     mongo_config = {
         'host': os.getenv('MONGO_HOST'),
@@ -71,22 +683,10 @@ if __name__ == "__main__":
         'password': os.getenv('MONGO_PASSWORD'),
     }
 
-    # Initialize MongoDB connection
-    mongo = MongoDBConnector(**mongo_config)
-    mongo_collection_name = "raw_collection"  # Collection name in MongoDB
-
-    try:
-        # Fetch data from MongoDB
-        mongo.connect()
-        mongo_data = mongo.fetch_all(mongo_collection_name)
-
-        if mongo_data:
-            headers = mongo_data[0].keys()  # Get keys from the first document as headers
-            rows = [list(doc.values()) for doc in mongo_data]  # Extract values as rows
-            ToCSV.write_to_csv(rows, "processed_mongodb_data.csv", headers=headers)
-        else:
-            print("No data found in MongoDB.")
-    except Exception as e:
-        print(f"Unexpected error during MongoDB processing: {e}")
-    finally:
-        mongo.close()  # Close MongoDB connection
\ No newline at end of file
+    if args.command != 'export':
+        run_query_command(postgre_config, args)
+    elif args.workers > 1:
+        run_parallel_export(postgre_config, mongo_config, args)
+    else:
+        run_postgres_export(postgre_config, args)
+        run_mongo_export(mongo_config, args)
\ No newline at end of file